@@ -0,0 +1,185 @@
+"""Deterministic, offline stand-ins for OpenAIEmbeddings, OpenAI and LayoutPDFReader."""
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+from llmsherpa.readers import Document as SherpaDocument
+
+from report_pipeline.utils.parse_cache import ParseCache
+
+
+class FakeEmbeddings(Embeddings):
+    """Unit vectors seeded from the text hash, with a fixed latency per API call."""
+
+    def __init__(self, dimension: int = 384, latency: float = 0.0, model: str = "fake-embedding") -> None:
+        self.dimension = dimension
+        self.latency = latency
+        self.model = model
+        self.calls = 0
+        self.texts_embedded = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._record_call(len(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self._record_call(1)
+        return self._vector(text)
+
+    def _record_call(self, text_count: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.texts_embedded += text_count
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimension)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+
+def canned_slide(title: str, slide_type: str) -> dict:
+    return {
+        "title": title,
+        "table_caption": "",
+        "table": "",
+        "content": ["Revenue grew 8% year over year", "Operating margin improved to 14%"],
+        "recommendations": ["Keep investing in the highest-return segments"] if slide_type == "action_items" else [],
+        "slide_type": slide_type
+    }
+
+
+CANNED_PRESENTATION = {"slides": [
+    canned_slide("Summary", "summary"),
+    canned_slide("Performance", "content"),
+    canned_slide("Risks and Opportunities", "content"),
+    canned_slide("Recommendations", "action_items")
+]}
+
+CANNED_OUTLINE = {"slides": [
+    {"title": slide["title"], "slide_type": slide["slide_type"], "focus": "Key figures and trends"}
+    for slide in CANNED_PRESENTATION["slides"]
+]}
+
+CANNED_FACTS = {"facts": [
+    {"metric": "Revenue", "value": "1,250m EUR (2023)", "statement": "Revenue grew 8% year over year.", "source": "p.4"},
+    {"metric": "Operating margin", "value": "14%", "statement": "Margin improved by 1.5 points.", "source": "p.6"}
+]}
+
+
+class FakeReportLLM(LLM):
+    """Returns canned JSON matching whichever output schema the prompt asks for.
+
+    Each completion takes `latency` seconds plus `token_latency` per output token (~4 characters).
+    """
+
+    latency: float = 0.0
+    token_latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-report"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        response = self._respond(prompt)
+        time.sleep(self._duration(response))
+        return response
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        response = self._respond(prompt)
+        await asyncio.sleep(self._duration(response))
+        return response
+
+    def _duration(self, response: str) -> float:
+        return self.latency + self.token_latency * len(response) / 4
+
+    @staticmethod
+    def _respond(prompt: str) -> str:
+        if "Extract the key facts" in prompt:
+            return json.dumps(CANNED_FACTS)
+        if "plan its slides only" in prompt:
+            return json.dumps(CANNED_OUTLINE)
+        if "Write ONLY the following slide" in prompt:
+            return json.dumps(canned_slide("Slide", "content"))
+        return json.dumps(CANNED_PRESENTATION)
+
+
+def synthetic_layout(sections: int = 40, seed: int = 0) -> List[dict]:
+    """LLMSherpa-style layout blocks shaped like an annual report: nested sections with paragraphs, lists and tables."""
+    rng = random.Random(seed)
+    words = ("revenue margin cash flow debt ratio investment growth cost supply chain workforce "
+             "capacity risk market share customers segment efficiency sustainability dividend").split()
+
+    def sentence() -> str:
+        figure = f"{rng.randint(1, 999)},{rng.randint(100, 999)}.{rng.randint(0, 9)}"
+        return " ".join(rng.choice(words) for _ in range(rng.randint(10, 25))).capitalize() + f" reached {figure} EUR."
+
+    blocks = []
+    page_idx = 0
+
+    def add(block: dict) -> None:
+        nonlocal page_idx
+        block.update({"block_idx": len(blocks), "page_idx": page_idx, "bbox": [50, 50, 550, 120]})
+        blocks.append(block)
+        if len(blocks) % 12 == 0:
+            page_idx += 1
+
+    for section in range(sections):
+        add({"tag": "header", "level": 0, "sentences": [f"Section {section + 1}"]})
+        for subsection in range(rng.randint(1, 3)):
+            add({"tag": "header", "level": 1, "sentences": [f"Topic {section + 1}.{subsection + 1}"]})
+            for _ in range(rng.randint(2, 5)):
+                add({"tag": "para", "level": 2, "sentences": [sentence() for _ in range(rng.randint(1, 4))]})
+            if rng.random() < 0.5:
+                for _ in range(rng.randint(2, 5)):
+                    add({"tag": "list_item", "level": 2, "sentences": [sentence()]})
+            if rng.random() < 0.4:
+                rows = [{"type": "table_header", "cells": [{"cell_value": name} for name in ("Metric", "2022", "2023")]}]
+                for _ in range(rng.randint(3, 8)):
+                    rows.append({"type": "table_data_row", "cells": [
+                        {"cell_value": rng.choice(words)},
+                        {"cell_value": str(rng.randint(100, 9999))},
+                        {"cell_value": str(rng.randint(100, 9999))}
+                    ]})
+                add({"tag": "table", "level": 2, "name": "table", "table_rows": rows})
+
+    return blocks
+
+
+class FakeLayoutPDFReader:
+    """Replays recorded layout JSON instead of calling the LLMSherpa service.
+
+    The recording of a PDF is looked up in `recordings` (a ParseCache directory filled by a
+    real reindex); PDFs without one get a deterministic synthetic layout.
+    """
+
+    def __init__(self, recordings: Optional[ParseCache] = None, latency: float = 0.0, synthetic_sections: int = 40) -> None:
+        self.recordings = recordings
+        self.latency = latency
+        self.synthetic_sections = synthetic_sections
+        self.replayed = 0
+        self.synthesized = 0
+
+    def read_pdf(self, path_or_url: str, contents: Optional[bytes] = None) -> SherpaDocument:
+        if self.latency:
+            time.sleep(self.latency)
+
+        blocks_json = None
+        if self.recordings is not None:
+            blocks_json = self.recordings.load(ParseCache.content_hash(path_or_url))
+
+        if blocks_json is None:
+            self.synthesized += 1
+            blocks_json = synthetic_layout(self.synthetic_sections)
+        else:
+            self.replayed += 1
+        return SherpaDocument(blocks_json)
@@ -0,0 +1,191 @@
+"""Offline benchmark of the report pipeline overhead.
+
+OpenAI and LLMSherpa are replaced by the deterministic fakes in `fakes.py`, so the numbers
+measure the pipeline itself (parsing, indexing, retrieval, prompt assembly, parsing of
+completions, HTTP layer) plus the configured fake latencies. Results are written as JSON
+so runs can be compared to catch regressions.
+
+    python benchmarks/run_benchmarks.py --output bench_results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+import httpx
+import numpy as np
+
+from report_pipeline.pdf_processor import PARSE_CACHE_DIR, PDFProcessor, RetrievalMode, VectorStoreManager
+from report_pipeline.report_cache import ReportCache
+from report_pipeline.report_generator import GenerationMode, ReportType
+from report_pipeline.utils.embedding_cache import CachedEmbeddings
+from report_pipeline.utils.generation import queries
+from report_pipeline.utils.parse_cache import ParseCache
+from report_pipeline.vector_store_provider import VectorStoreProvider
+
+from fakes import FakeEmbeddings, FakeLayoutPDFReader, FakeReportLLM
+
+COLLECTION_NAME = "benchmark_content"
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds."""
+    values = np.array(samples) * 1000
+    return {
+        "count": len(samples),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max())
+    }
+
+
+def timed(fn: Callable):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def bench_ingestion(args, workdir: str, embeddings: FakeEmbeddings) -> Dict:
+    reader = FakeLayoutPDFReader(recordings=ParseCache(args.recordings), latency=args.parser_latency)
+    parse_cache = ParseCache(os.path.join(workdir, "parse_cache"))
+    document_id = os.path.splitext(os.path.basename(args.pdf))[0]
+
+    blocks, parse_cold = timed(lambda: PDFProcessor(parse_cache, reader).extract_text(args.pdf, document_id=document_id))
+    _, parse_cached = timed(lambda: PDFProcessor(parse_cache, reader).extract_text(args.pdf, document_id=document_id))
+
+    vector_store = VectorStoreManager(COLLECTION_NAME, os.path.join(workdir, "db"), embeddings)
+    calls_before = embeddings.calls
+    stats, store_time = timed(lambda: vector_store.store_content(document_id, blocks))
+    store_calls = embeddings.calls - calls_before
+
+    calls_before = embeddings.calls
+    _, reindex_time = timed(lambda: vector_store.store_content(document_id, blocks))
+
+    return {
+        "layout_source": "recorded" if reader.replayed else "synthetic",
+        "blocks": len(blocks),
+        "parse_cold_s": parse_cold,
+        "parse_cached_s": parse_cached,
+        "parse_blocks_per_s": len(blocks) / parse_cold,
+        "store_s": store_time,
+        "store_blocks_per_s": stats["added"] / store_time if store_time else 0.0,
+        "store_embedding_calls": store_calls,
+        "reindex_unchanged_s": reindex_time,
+        "reindex_unchanged_embedding_calls": embeddings.calls - calls_before
+    }
+
+
+def bench_retrieval(args, workdir: str, embeddings: CachedEmbeddings) -> Dict:
+    vector_store = VectorStoreManager(COLLECTION_NAME, os.path.join(workdir, "db"), embeddings)
+    embeddings.embed_documents([query for report_queries in queries.values() for query in report_queries])
+
+    results = {}
+    for mode in RetrievalMode:
+        samples = []
+        for _ in range(args.retrieval_repeats):
+            for report_queries in queries.values():
+                _, elapsed = timed(lambda: vector_store.retrieve_content_batch(report_queries, mode=mode))
+                samples.append(elapsed)
+        results[mode.value] = summarize(samples)
+    return results
+
+
+async def run_load(client: httpx.AsyncClient, path: str, payloads: List[Dict], concurrency: int) -> Dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: List[float] = []
+    errors = 0
+
+    async def send(payload: Dict) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(path, json=payload)
+            samples.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(payload) for payload in payloads))
+    wall_time = time.perf_counter() - start
+
+    return {**summarize(samples), "errors": errors, "wall_s": wall_time, "requests_per_s": len(payloads) / wall_time}
+
+
+async def bench_end_to_end(args, workdir: str, embeddings: CachedEmbeddings) -> Dict:
+    import main
+
+    # Keep the usage callbacks so token accounting is part of the measured overhead
+    for component in [*main.generators.values(), main.fact_extractor]:
+        component.llm = FakeReportLLM(latency=args.llm_latency, token_latency=args.llm_token_latency, callbacks=component.llm.callbacks)
+    main.store_provider = VectorStoreProvider(os.path.join(workdir, "db"), COLLECTION_NAME, embeddings)
+
+    report_types = [report_type.value for report_type in ReportType]
+    scenarios = {
+        "generate_report_single": ("/generate_report", {"generation_mode": GenerationMode.SINGLE.value}, False),
+        "generate_report_map_reduce": ("/generate_report", {"generation_mode": GenerationMode.MAP_REDUCE.value}, False),
+        "generate_report_cached": ("/generate_report", {}, True),
+        "generate_report_stream": ("/generate_report/stream", {}, False)
+    }
+
+    results = {}
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for name, (path, extra, cached) in scenarios.items():
+                main.report_cache = ReportCache() if cached else ReportCache(max_entries=0)
+                payloads = [{"report_type": report_types[i % len(report_types)], **extra} for i in range(args.requests)]
+                if cached:
+                    await run_load(client, path, payloads[:len(report_types)], args.concurrency)
+                results[name] = await run_load(client, path, payloads, args.concurrency)
+
+            pack_payloads = [{} for _ in range(max(1, args.requests // len(report_types)))]
+            results["generate_report_pack"] = await run_load(client, "/generate_report_pack", pack_payloads, args.concurrency)
+
+    return results
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results")
+    parser.add_argument("--pdf", default=os.path.join(ROOT_DIR, "data", "2023-annual-report.pdf"))
+    parser.add_argument("--recordings", default=PARSE_CACHE_DIR, help="Parse cache directory holding recorded layout JSON")
+    parser.add_argument("--requests", type=int, default=30, help="Requests per end-to-end scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--retrieval-repeats", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake completion latency, seconds")
+    parser.add_argument("--llm-token-latency", type=float, default=0.0, help="Fake latency per output token, seconds")
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="Fake latency per embedding call, seconds")
+    parser.add_argument("--parser-latency", type=float, default=0.0, help="Fake LLMSherpa latency, seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="report-benchmark-") as workdir:
+        fake_embeddings = FakeEmbeddings(latency=args.embedding_latency)
+        cached_embeddings = CachedEmbeddings(fake_embeddings, cache_dir=os.path.join(workdir, "embedding_cache"))
+
+        results = {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "config": vars(args),
+            "ingestion": bench_ingestion(args, workdir, fake_embeddings),
+            "retrieval": bench_retrieval(args, workdir, cached_embeddings),
+            "end_to_end": asyncio.run(bench_end_to_end(args, workdir, cached_embeddings))
+        }
+        results["embedding_calls_total"] = fake_embeddings.calls
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
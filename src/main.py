@@ -1,17 +1,69 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import os
+import shutil
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 
+from langchain_core.documents import Document
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel
 
-from report_pipeline.pdf_processor import PDFProcessor, VectorStoreManager
-from report_pipeline.report_generator import Presentation, ReportType
+from report_pipeline.pdf_processor import (
+    DATA_DIR,
+    DEFAULT_DOCUMENT_ID,
+    DOCUMENT_ID_PATTERN,
+    MAX_RETRIEVED_BLOCKS,
+    RetrievalMode,
+    VectorStoreManager,
+    document_path,
+)
+from report_pipeline.fact_extractor import FactExtractor, FactSheet
+from report_pipeline.ingestion import IngestionJob, IngestionQueue
+from report_pipeline.report_cache import ReportCache
+from report_pipeline.report_generator import GenerationMode, Presentation, ReportType, SlideContent
+from report_pipeline.vector_store_provider import VectorStoreProvider
 
-from report_pipeline.utils.search_results import SearchResults
 from report_pipeline.utils.generation import generators, queries
+from report_pipeline.utils.metrics import COALESCED_REQUESTS, record_cache_hit, span
+from report_pipeline.utils.single_flight import SingleFlight
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+logger = logging.getLogger(__name__)
+
+store_provider = VectorStoreProvider()
+report_cache = ReportCache(
+    ttl_seconds=float(os.getenv("REPORT_CACHE_TTL_SECONDS", 24 * 3600)),
+    cache_dir=os.getenv("REPORT_CACHE_DIR")
+)
+ingestion_queue = IngestionQueue(store_provider, on_corpus_change=report_cache.bump_corpus_version)
+fact_extractor = FactExtractor()
+report_flights: SingleFlight[Presentation] = SingleFlight()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(store_provider.open)
+    
+    # The report queries never change: embed them once so retrieval only hits the cache
+    all_queries = [query for report_queries in queries.values() for query in report_queries]
+    try:
+        await asyncio.to_thread(store_provider.embedding_function.embed_documents, all_queries)
+    except Exception:
+        logger.exception("Could not pre-warm the query embedding cache")
+    
+    yield
+    
+    ingestion_queue.shutdown()
+    store_provider.close()
 
 app = FastAPI(
     title="Report Generation API",
-    description="API for generating stakeholder-specific reports from PDF documents"
+    description="API for generating stakeholder-specific reports from PDF documents",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -24,43 +76,182 @@ app.add_middleware(
 
 class ReportRequest(BaseModel):
     report_type: ReportType
+    document_id: Optional[str] = None
+    year: Optional[int] = None
+    retrieval_mode: RetrievalMode = RetrievalMode.HYBRID
+    generation_mode: GenerationMode = GenerationMode.SINGLE
+
+class ReportPackRequest(BaseModel):
+    document_id: Optional[str] = None
+    year: Optional[int] = None
+    retrieval_mode: RetrievalMode = RetrievalMode.HYBRID
+
+class ReportPack(BaseModel):
+    facts: FactSheet
+    reports: Dict[ReportType, Presentation]
+
+async def retrieve_blocks(query_list: List[str], request: ReportRequest | ReportPackRequest, **kwargs) -> List[Document]:
+    """Retrieve the blocks for a report, raising 404 rather than generating from an empty context."""
+    filter = VectorStoreManager.document_filter(request.document_id, request.year)
+    with span("retrieval", mode=request.retrieval_mode.value, queries=len(query_list)) as attributes, store_provider.lease() as vector_store:
+        if request.document_id is not None and request.document_id not in vector_store.list_documents():
+            raise HTTPException(status_code=404, detail=f"Document is not indexed: {request.document_id}")
+        
+        docs = await asyncio.to_thread(
+            vector_store.retrieve_content_batch,
+            query_list,
+            filter=filter,
+            mode=request.retrieval_mode,
+            **kwargs
+        )
+        attributes["blocks"] = len(docs)
+    
+    if not docs:
+        raise HTTPException(status_code=404, detail=f"No indexed blocks match document_id={request.document_id}, year={request.year}")
+    return docs
+
+async def retrieve_report_data(request: ReportRequest) -> List[Document]:
+    return await retrieve_blocks(queries[request.report_type], request)
+
+def validate_document_id(document_id: str) -> None:
+    if not DOCUMENT_ID_PATTERN.match(document_id):
+        raise HTTPException(status_code=400, detail=f"Invalid document id: {document_id}")
 
 @app.post("/generate_report", response_model=Presentation)
 async def generate_report(request: ReportRequest):
-    vector_store = VectorStoreManager()
-    
+    # Identical requests arriving while one is generating share its retrieval and completion
+    flight_key = (request.model_dump_json(), report_cache.corpus_version)
+    if report_flights.is_in_flight(flight_key):
+        COALESCED_REQUESTS.labels(endpoint="generate_report").inc()
+    return await report_flights.run(flight_key, lambda: build_report(request))
+
+async def build_report(request: ReportRequest) -> Presentation:
     selected_type = request.report_type
     
     generator = generators[selected_type]
-    query = queries[selected_type]
 
-    search_results = SearchResults()
-    for query in queries:
-        docs = vector_store.retrieve_content(query)
-        for doc in docs:
-            search_results.add_result(doc)
+    with span("generate_report", report_type=selected_type.value, generation_mode=request.generation_mode.value):
+        docs = await retrieve_report_data(request)
         
-    generator.create_report(search_results.get_results())
+        cache_key = report_cache.make_key(selected_type, generator.prompt_versions[request.generation_mode], docs)
+        report = report_cache.get(cache_key)
+        record_cache_hit("report", report is not None)
+        if report is None:
+            with span("generation", generation_mode=request.generation_mode.value):
+                if request.generation_mode == GenerationMode.MAP_REDUCE:
+                    report = await generator.acreate_report_map_reduce(docs)
+                else:
+                    report = await generator.acreate_report(docs)
+            report_cache.put(cache_key, report)
     
-    print(generator.report_content)
+    logger.debug("Generated %s report with %d slides", selected_type.value, len(report.slides))
     
-    return generator.report_content
+    return report
+
+@app.post("/generate_report/stream")
+async def generate_report_stream(request: ReportRequest):
+    """Stream the report as NDJSON, one `SlideContent` per line as soon as it is generated."""
+    selected_type = request.report_type
+    
+    generator = generators[selected_type]
+
+    docs = await retrieve_report_data(request)
+    
+    cache_key = report_cache.make_key(selected_type, generator.prompt_versions[request.generation_mode], docs)
+    cached_report = report_cache.get(cache_key)
+    record_cache_hit("report", cached_report is not None)
+    
+    async def stream_slides():
+        if cached_report is not None:
+            for slide in cached_report.slides:
+                yield slide.model_dump_json() + "\n"
+            return
+        
+        slides: list[SlideContent] = []
+        if request.generation_mode == GenerationMode.MAP_REDUCE:
+            slide_stream = generator.astream_report_map_reduce(docs)
+        else:
+            slide_stream = generator.astream_report(docs)
+        
+        with span("generation", generation_mode=f"stream_{request.generation_mode.value}", report_type=selected_type.value):
+            async for slide in slide_stream:
+                slides.append(slide)
+                yield slide.model_dump_json() + "\n"
+        
+        report_cache.put(cache_key, Presentation(slides=slides))
+    
+    return StreamingResponse(stream_slides(), media_type="application/x-ndjson")
+
+@app.post("/generate_report_pack", response_model=ReportPack)
+async def generate_report_pack(request: ReportPackRequest):
+    """CFO, CEO and COO reports from one retrieval and one shared fact extraction pass."""
+    union_queries = list(dict.fromkeys(query for report_queries in queries.values() for query in report_queries))
+    with span("generate_report_pack"):
+        docs = await retrieve_blocks(union_queries, request, max_blocks=MAX_RETRIEVED_BLOCKS * len(generators))
+        
+        with span("fact_extraction"):
+            facts = await fact_extractor.aextract(docs)
+        fact_context = facts.to_context()
         
-@app.get("/reindex_document")
-async def reindex_doc():
-    vector_store = VectorStoreManager()
+        report_types = list(generators)
+        with span("generation", generation_mode="pack"):
+            presentations = await asyncio.gather(*(
+                generators[report_type].acreate_report_from_context(fact_context) for report_type in report_types
+            ))
     
-    pdf_processor = PDFProcessor()
+    return ReportPack(facts=facts, reports=dict(zip(report_types, presentations)))
+        
+@app.get("/reindex_document", response_model=IngestionJob, status_code=202)
+async def reindex_doc(document_id: str = DEFAULT_DOCUMENT_ID, full: bool = False):
+    """Queue a reindex of one document, or with `full` a rebuild of every indexed document."""
+    validate_document_id(document_id)
+    if not os.path.exists(document_path(document_id)):
+        raise HTTPException(status_code=404, detail=f"Unknown document: {document_id}")
     
-    vector_store.reset_store()
+    if not full:
+        return ingestion_queue.submit([document_id])
     
-    content_blocks = pdf_processor.extract_text("./data/2023-annual-report.pdf")
+    with store_provider.lease() as vector_store:
+        document_ids = set(await asyncio.to_thread(vector_store.list_documents))
+    document_ids.add(document_id)
     
-    pdf_processor.document_stats()
+    return ingestion_queue.submit(
+        [indexed_id for indexed_id in sorted(document_ids) if os.path.exists(document_path(indexed_id))],
+        full_rebuild=True
+    )
+
+@app.post("/documents", response_model=IngestionJob, status_code=202)
+async def upload_document(file: UploadFile = File(...), document_id: Optional[str] = Form(None), year: Optional[int] = Form(None)):
+    """Store an uploaded PDF under `data/` and queue its ingestion."""
+    document_id = document_id or os.path.splitext(os.path.basename(file.filename or ""))[0]
+    validate_document_id(document_id)
     
-    vector_store.store_content(content_blocks)
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with open(document_path(document_id), "wb") as f:
+        await asyncio.to_thread(shutil.copyfileobj, file.file, f)
     
-    return "ok"
+    return ingestion_queue.submit([document_id], year=year)
+
+@app.get("/jobs", response_model=List[IngestionJob])
+async def list_jobs():
+    return ingestion_queue.list()
+
+@app.get("/jobs/{job_id}", response_model=IngestionJob)
+async def get_job(job_id: str):
+    job = ingestion_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+@app.get("/documents")
+async def list_documents():
+    with store_provider.lease() as vector_store:
+        return await asyncio.to_thread(vector_store.list_documents)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-stage latency histograms, LLM tokens and cost, retrieved blocks and cache hits."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 @app.get("/health")
 async def health_check():
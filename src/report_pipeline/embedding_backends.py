@@ -0,0 +1,55 @@
+import os
+from enum import Enum
+from typing import List
+
+from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from report_pipeline.openai_clients import RateLimitedEmbeddings
+from report_pipeline.utils.embedding_cache import CachedEmbeddings
+
+
+LOCAL_EMBEDDING_BATCH_SIZE = 32
+
+
+class EmbeddingBackend(str, Enum):
+    OPENAI = "openai"
+    LOCAL = "local"
+
+
+class LocalEmbeddings(Embeddings):
+    """all-MiniLM-L6-v2 run on the CPU with ONNX Runtime, batched in NumPy: no network round-trip and no per-token cost.
+
+    This is the model chromadb bundles as its default embedding function; its ONNX export
+    (~90MB) is downloaded to ~/.cache/chroma on first use.
+    """
+
+    model = ONNXMiniLM_L6_V2.MODEL_NAME
+
+    def __init__(self, batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE) -> None:
+        self.batch_size = batch_size
+        self._model = ONNXMiniLM_L6_V2(preferred_providers=["CPUExecutionProvider"])
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(vector.tolist() for vector in self._model(texts[start:start + self.batch_size]))
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def create_embeddings(backend: EmbeddingBackend) -> Embeddings:
+    if backend == EmbeddingBackend.LOCAL:
+        return LocalEmbeddings()
+    # Retries are left to the shared limiter
+    return RateLimitedEmbeddings(OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"), max_retries=0))
+
+
+def embedding_backend_id(embeddings: Embeddings) -> str:
+    """Identify the model behind an embedding function, as recorded on the collections it builds."""
+    while isinstance(embeddings, (CachedEmbeddings, RateLimitedEmbeddings)):
+        embeddings = embeddings.embeddings
+    return f"{type(embeddings).__name__}:{getattr(embeddings, 'model', '')}"
@@ -0,0 +1,80 @@
+import os
+from typing import List, Optional
+
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.prompts import PromptTemplate
+from pydantic import BaseModel, Field
+
+from report_pipeline.openai_clients import RateLimitedOpenAI
+from report_pipeline.utils.context_packing import ContextPacker
+from report_pipeline.utils.metrics import LLMUsageHandler, span
+
+load_dotenv()
+
+FACT_MAX_TOKENS = 900
+FACT_CONTEXT_TOKEN_BUDGET = int(os.getenv("FACT_CONTEXT_TOKEN_BUDGET", 2500))
+
+
+class Fact(BaseModel):
+    metric: str = Field(description="Short name of the KPI, figure or topic")
+    value: str = Field(description="The figure with its unit and period, empty if qualitative", default="")
+    statement: str = Field(description="One sentence stating the fact and its trend or context")
+    source: str = Field(description="Section path and page the fact comes from, as given in the data header", default="")
+
+
+class FactSheet(BaseModel):
+    facts: List[Fact]
+
+    def to_context(self) -> str:
+        lines = []
+        for fact in self.facts:
+            value = f" = {fact.value}" if fact.value else ""
+            source = f" [{fact.source}]" if fact.source else ""
+            lines.append(f"- {fact.metric}{value}: {fact.statement}{source}")
+        return "\n".join(lines)
+
+
+class FactExtractor:
+    """Shared extraction pass: condenses the retrieved blocks into the facts and KPIs every stakeholder report needs."""
+    def __init__(self, context_token_budget: Optional[int] = None):
+        self.llm = RateLimitedOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_tokens=FACT_MAX_TOKENS, temperature=0)
+        self.output_parser = PydanticOutputParser(pydantic_object=FactSheet)
+        self.prompt = PromptTemplate(
+            template="""
+            Extract the key facts from the following annual report data. They will be the only input for three
+            presentations, written for the CFO, the CEO and the COO, so cover:
+                - Financial metrics: revenue, costs, margins, cash flow, debt, investments and returns, with their trends.
+                - Strategy: market position, competition, growth opportunities, risks and long-term priorities.
+                - Operations: efficiency KPIs, bottlenecks, supply chain, workforce, capacity and sustainability.
+
+            Instructions:
+            - Keep every figure exactly as written in the data, with its unit and period.
+            - One fact per item, no duplicates, no opinions or recommendations.
+            - Cite the header of the block each fact comes from as its source.
+
+            Data:
+            {data}
+
+            Format Instructions:
+            {format_instructions}
+            """,
+            input_variables=["data"],
+            partial_variables={"format_instructions": self.output_parser.get_format_instructions()}
+        )
+
+        self.context_packer = ContextPacker(token_budget=context_token_budget or FACT_CONTEXT_TOKEN_BUDGET, model_name=self.llm.model_name)
+        self.context_packer.fit_to_context(self.prompt.format(data=""), self.llm.max_context_size, self.llm.max_tokens)
+        self.llm.callbacks = [LLMUsageHandler(type(self).__name__, self.llm.model_name, self.context_packer.count_tokens)]
+
+    async def aextract(self, data: List[Document]) -> FactSheet:
+        chain = self.prompt | self.llm
+        with span("facts.pack_context", blocks=len(data)):
+            prompt_input = {"data": self.context_packer.pack(data)}
+        with span("facts.llm"):
+            result = await chain.ainvoke(prompt_input)
+        with span("facts.parse") as attributes:
+            fact_sheet = self.output_parser.parse(result)
+            attributes["facts"] = len(fact_sheet.facts)
+        return fact_sheet
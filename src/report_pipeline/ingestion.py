@@ -0,0 +1,179 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from enum import Enum
+from typing import Callable, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel, Field
+
+from llmsherpa.readers import Document as SherpaDocument
+
+from report_pipeline.pdf_processor import (
+    EMBEDDING_BATCH_SIZE,
+    PDFProcessor,
+    VectorStoreManager,
+    document_path,
+)
+from report_pipeline.utils.metrics import span
+from report_pipeline.vector_store_provider import VectorStoreProvider
+
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    PARSING = "parsing"
+    EMBEDDING = "embedding"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class IngestionJob(BaseModel):
+    job_id: str
+    document_ids: List[str]
+    year: Optional[int] = None
+    full_rebuild: bool = False
+    status: JobStatus = JobStatus.QUEUED
+    documents_parsed: int = 0
+    blocks_parsed: int = 0
+    blocks_to_embed: int = 0
+    blocks_embedded: int = 0
+    stats: Dict[str, int] = Field(default_factory=dict)
+    error: Optional[str] = None
+    created_at: float = Field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+
+def parse_document(document_id: str) -> None:
+    """Parse one PDF into the parse cache. Runs in a worker process, nothing but completion is sent back."""
+    PDFProcessor().cache_layout(document_path(document_id))
+
+
+class IngestionQueue:
+    """Background ingestion: PDFs are parsed in a process pool, blocks are embedded in bounded batches.
+
+    Each job runs on a coordinator thread, so HTTP workers only enqueue and poll. The pool
+    only fills the parse cache; once a document's parse completes, the coordinator reads it
+    back and streams its blocks into the store. Writes go through the VectorStoreProvider
+    and are serialised with other writers there, and are only started once the parses
+    they need are done.
+    """
+
+    def __init__(
+        self,
+        store_provider: VectorStoreProvider,
+        parse_workers: Optional[int] = None,
+        max_concurrent_jobs: int = 4,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        on_corpus_change: Optional[Callable[[], None]] = None
+    ) -> None:
+        self.store_provider = store_provider
+        self.batch_size = batch_size
+        self.on_corpus_change = on_corpus_change
+
+        # Forking a process that already runs threads can deadlock the child, start workers fresh instead
+        self._parse_pool = ProcessPoolExecutor(max_workers=parse_workers or os.cpu_count(), mp_context=multiprocessing.get_context("spawn"))
+        self._job_runner = ThreadPoolExecutor(max_workers=max_concurrent_jobs, thread_name_prefix="ingestion")
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, document_ids: List[str], year: Optional[int] = None, full_rebuild: bool = False) -> IngestionJob:
+        job = IngestionJob(job_id=uuid.uuid4().hex, document_ids=document_ids, year=year, full_rebuild=full_rebuild)
+        with self._lock:
+            self._jobs[job.job_id] = job
+
+        self._job_runner.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[IngestionJob]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def shutdown(self) -> None:
+        self._job_runner.shutdown(wait=False, cancel_futures=True)
+        self._parse_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: IngestionJob) -> None:
+        try:
+            futures = self._parse(job)
+            years = self._document_years(job)
+
+            if job.full_rebuild:
+                # The replacement collection is filled in one go: finish every parse before taking the write lock
+                with span("ingestion.parse", documents=len(futures)):
+                    document_ids = list(self._parsed_documents(job, futures))
+                with span("ingestion.write", documents=len(document_ids), full_rebuild=True):
+                    self.store_provider.rebuild(lambda vector_store: self._write_all(job, vector_store, document_ids, years))
+            else:
+                for document_id in self._parsed_documents(job, futures):
+                    doc = PDFProcessor().read_document(document_path(document_id))
+                    with span("ingestion.write", documents=1, full_rebuild=False):
+                        self.store_provider.update(lambda vector_store: self._write(job, vector_store, document_id, doc, years[document_id]))
+                    del doc
+
+            job.status = JobStatus.COMPLETED
+            if (job.full_rebuild or job.stats.get("added") or job.stats.get("deleted")) and self.on_corpus_change:
+                self.on_corpus_change()
+        except Exception as e:
+            logger.exception("Ingestion job %s failed", job.job_id)
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+
+    def _parse(self, job: IngestionJob) -> Dict[Future, str]:
+        """Start parsing every document of the job into the parse cache."""
+        job.status = JobStatus.PARSING
+        return {self._parse_pool.submit(parse_document, document_id): document_id for document_id in job.document_ids}
+
+    def _document_years(self, job: IngestionJob) -> Dict[str, Optional[int]]:
+        """The job's year, or else the year each document was indexed with: reindexes and rebuilds keep it."""
+        if job.year is not None:
+            return dict.fromkeys(job.document_ids, job.year)
+        with self.store_provider.lease() as vector_store:
+            return {document_id: vector_store.document_year(document_id) for document_id in job.document_ids}
+
+    @staticmethod
+    def _parsed_documents(job: IngestionJob, futures: Dict[Future, str]) -> Iterator[str]:
+        """Yield each document ID as soon as its parse completes, re-raising a failed parse."""
+        for future in as_completed(futures):
+            future.result()
+            job.documents_parsed += 1
+            yield futures[future]
+
+    def _write_all(self, job: IngestionJob, vector_store: VectorStoreManager, document_ids: List[str], years: Dict[str, Optional[int]]) -> None:
+        for document_id in document_ids:
+            self._write(job, vector_store, document_id, PDFProcessor().read_document(document_path(document_id)), years[document_id])
+
+    def _write(self, job: IngestionJob, vector_store: VectorStoreManager, document_id: str, doc: SherpaDocument, year: Optional[int]) -> None:
+        """Stream the blocks of a parsed document into the store: only the Sherpa document and one batch are held."""
+        pdf_processor = PDFProcessor()
+        job.status = JobStatus.EMBEDDING
+        embedded_before = job.blocks_embedded
+
+        # New blocks are only known as the single pass finds them: each batch is added to the total before it is embedded
+        def progress(written: int, found: int) -> None:
+            job.blocks_to_embed = embedded_before + found
+            job.blocks_embedded = embedded_before + written
+
+        stats = vector_store.store_content(
+            document_id,
+            pdf_processor.iter_document_blocks(doc, document_id, year),
+            batch_size=self.batch_size,
+            progress=progress
+        )
+        pdf_processor.document_stats()
+
+        for key, value in stats.items():
+            job.stats[key] = job.stats.get(key, 0) + value
+        job.blocks_parsed += stats["added"] + stats["unchanged"]
+        job.blocks_embedded = embedded_before + stats["added"]
@@ -0,0 +1,285 @@
+import gzip
+import json
+import math
+import os
+import re
+import shutil
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+SHARD_SUFFIX = ".json.gz"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*%?")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words and figures, keeping numbers such as `1,250.5` or `12%` whole."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def matches_filter(metadata: Dict, filter: Optional[Dict]) -> bool:
+    """Evaluate the subset of Chroma `where` clauses used by the pipeline ($and, $or, $in, equality)."""
+    if not filter:
+        return True
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            if "$in" in condition and metadata.get(key) not in condition["$in"]:
+                return False
+            if "$eq" in condition and metadata.get(key) != condition["$eq"]:
+                return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class LexicalIndex:
+    """BM25 inverted index over block texts, persisted next to the Chroma store as one gzipped JSON shard per document.
+
+    Only postings, block lengths and metadata are kept: texts stay in Chroma, `search`
+    returns ranked IDs. Queries run fully in-process, so lexical lookups never need an
+    embedding call. Filters on `document_id`, `year` and `parent_chain` resolve to candidate
+    blocks through per-document and per-section indexes, and only those are scored.
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75) -> None:
+        self.path = path
+        self.k1 = k1
+        self.b = b
+
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._metadata: Dict[str, Dict] = {}
+        self._document_blocks: Dict[str, Set[str]] = {}
+        self._document_years: Dict[str, Optional[int]] = {}
+        self._chain_blocks: Dict[str, Set[str]] = {}
+        self._total_length = 0
+        # Entries added since the last save, per document; deletions only mark their document
+        self._unsaved: Dict[str, Dict[str, Tuple[Dict, Dict[str, int]]]] = {}
+        self._lock = threading.RLock()
+
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, ids: List[str], texts: List[str], metadatas: List[Dict]) -> None:
+        with self._lock:
+            for block_id, text, metadata in zip(ids, texts, metadatas):
+                term_counts = Counter(tokenize(text))
+                if block_id in self._lengths:
+                    self._remove_terms(block_id, term_counts)
+                self._add(block_id, metadata, term_counts)
+                self._unsaved.setdefault(_document_of(metadata), {})[block_id] = (metadata, dict(term_counts))
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            removed = set()
+            for block_id in ids:
+                if block_id not in self._lengths:
+                    continue
+                document_id = _document_of(self._metadata[block_id])
+                self._forget(block_id)
+                self._unsaved.setdefault(document_id, {}).pop(block_id, None)
+                removed.add(block_id)
+            if not removed:
+                return
+
+            # Without the texts, a block's terms are only known from the postings
+            for term in list(self._postings):
+                postings = self._postings[term]
+                if len(removed) < len(postings):
+                    for block_id in removed:
+                        postings.pop(block_id, None)
+                else:
+                    for block_id in [block_id for block_id in postings if block_id in removed]:
+                        del postings[block_id]
+                if not postings:
+                    del self._postings[term]
+
+    def search(self, query: str, k: int = 4, filter: Optional[Dict] = None) -> List[Tuple[str, float]]:
+        """IDs of the `k` best BM25 matches among the blocks passing `filter`, best first."""
+        terms = set(tokenize(query))
+        with self._lock:
+            if not self._lengths:
+                return []
+
+            candidates = self._candidates(filter)
+            if candidates is not None and not candidates:
+                return []
+
+            doc_count = len(self._lengths)
+            avg_length = max(self._total_length / doc_count, 1)
+
+            scores: Counter = Counter()
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                if candidates is None:
+                    matches = postings.items()
+                elif len(candidates) < len(postings):
+                    matches = ((block_id, postings[block_id]) for block_id in candidates if block_id in postings)
+                else:
+                    matches = ((block_id, tf) for block_id, tf in postings.items() if block_id in candidates)
+                for block_id, tf in matches:
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[block_id] / avg_length)
+                    scores[block_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+            return scores.most_common(k)
+
+    def load(self) -> None:
+        with self._lock:
+            if os.path.isdir(self.path):
+                for filename in os.listdir(self.path):
+                    if not filename.endswith(SHARD_SUFFIX):
+                        continue
+                    with gzip.open(os.path.join(self.path, filename), "rt", encoding="utf-8") as f:
+                        for block_id, (metadata, term_counts) in json.load(f).items():
+                            self._add(block_id, metadata, term_counts)
+
+    def save(self) -> None:
+        """Rewrite the shards of the documents changed since the last save, untouched documents are not read or written."""
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, {}
+            live_ids = {document_id: set(self._document_blocks.get(document_id, ())) for document_id in unsaved}
+
+        os.makedirs(self.path, exist_ok=True)
+        for document_id, entries in unsaved.items():
+            path = self._shard_path(document_id)
+            shard = {}
+            if os.path.exists(path):
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    shard = json.load(f)
+            shard.update(entries)
+            shard = {block_id: entry for block_id, entry in shard.items() if block_id in live_ids[document_id]}
+
+            if not shard:
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(shard, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+
+    def drop(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._lengths.clear()
+            self._metadata.clear()
+            self._document_blocks.clear()
+            self._document_years.clear()
+            self._chain_blocks.clear()
+            self._unsaved.clear()
+            self._total_length = 0
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def _shard_path(self, document_id: str) -> str:
+        return os.path.join(self.path, f"{document_id}{SHARD_SUFFIX}")
+
+    def _candidates(self, filter: Optional[Dict]) -> Optional[Set[str]]:
+        """IDs of the blocks passing `filter`, None for all. Only clauses the indexes cannot resolve are checked block by block."""
+        if not filter:
+            return None
+        blocks, exact = self._filter_blocks(filter)
+        if exact:
+            return blocks
+        pool: Iterable[str] = self._metadata if blocks is None else blocks
+        return {block_id for block_id in pool if matches_filter(self._metadata[block_id], filter)}
+
+    def _filter_blocks(self, filter: Dict) -> Tuple[Optional[Set[str]], bool]:
+        """Blocks allowed by the `document_id`, `parent_chain` and `year` clauses of a filter, None when they do not restrict it.
+
+        The flag tells whether the set is exact, that is whether the filter has no other clauses.
+        """
+        allowed: List[Set[str]] = []
+        exact = True
+        for key, condition in filter.items():
+            if key == "$and":
+                for clause in condition:
+                    blocks, clause_exact = self._filter_blocks(clause)
+                    exact = exact and clause_exact
+                    if blocks is not None:
+                        allowed.append(blocks)
+            elif key == "$or":
+                options = [self._filter_blocks(clause) for clause in condition]
+                if all(blocks is not None for blocks, _ in options):
+                    allowed.append(set().union(*(blocks for blocks, _ in options)))
+                    exact = exact and all(option_exact for _, option_exact in options)
+                else:
+                    exact = False
+            elif key == "document_id":
+                allowed.append(set().union(*(self._document_blocks.get(value, ()) for value in _condition_values(condition))))
+            elif key == "parent_chain":
+                allowed.append(set().union(*(self._chain_blocks.get(value, ()) for value in _condition_values(condition))))
+            elif key == "year":
+                years = _condition_values(condition)
+                allowed.append(set().union(*(
+                    self._document_blocks[document_id] for document_id, year in self._document_years.items() if year in years
+                )))
+            else:
+                exact = False
+
+        if not allowed:
+            return None, False
+        allowed.sort(key=len)
+        return allowed[0].intersection(*allowed[1:]), exact
+
+    def _add(self, block_id: str, metadata: Dict, term_counts: Dict[str, int]) -> None:
+        document_id = _document_of(metadata)
+        self._metadata[block_id] = metadata
+        self._document_blocks.setdefault(document_id, set()).add(block_id)
+        self._document_years[document_id] = metadata.get("year")
+        self._chain_blocks.setdefault(metadata.get("parent_chain", ""), set()).add(block_id)
+        self._lengths[block_id] = sum(term_counts.values())
+        self._total_length += self._lengths[block_id]
+        for term, tf in term_counts.items():
+            self._postings.setdefault(term, {})[block_id] = tf
+
+    def _remove_terms(self, block_id: str, term_counts: Dict[str, int]) -> None:
+        """Remove a block that is re-added with the same text, its postings are those of `term_counts`."""
+        self._forget(block_id)
+        for term in term_counts:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(block_id, None)
+            if not postings:
+                del self._postings[term]
+
+    def _forget(self, block_id: str) -> None:
+        metadata = self._metadata.pop(block_id)
+        document_id = _document_of(metadata)
+        self._total_length -= self._lengths.pop(block_id)
+        _discard(self._document_blocks, document_id, block_id)
+        if document_id not in self._document_blocks:
+            self._document_years.pop(document_id, None)
+        _discard(self._chain_blocks, metadata.get("parent_chain", ""), block_id)
+
+
+def _document_of(metadata: Dict) -> str:
+    # Document IDs start with a letter or digit, so the fallback cannot collide with one
+    return metadata.get("document_id") or "_"
+
+
+def _discard(index: Dict[str, Set[str]], key: str, block_id: str) -> None:
+    blocks = index[key]
+    blocks.discard(block_id)
+    if not blocks:
+        del index[key]
+
+
+def _condition_values(condition) -> List:
+    if isinstance(condition, dict):
+        if "$in" in condition:
+            return list(condition["$in"])
+        return [condition.get("$eq")]
+    return [condition]
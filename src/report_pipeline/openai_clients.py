@@ -0,0 +1,98 @@
+import os
+from typing import Any, AsyncIterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.outputs import GenerationChunk, LLMResult
+from langchain_openai import OpenAI
+
+from report_pipeline.utils.rate_limiter import RateLimiter
+
+
+COMPLETION_MAX_CONCURRENCY = int(os.getenv("OPENAI_COMPLETION_MAX_CONCURRENCY", 8))
+COMPLETION_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_COMPLETION_TOKENS_PER_MINUTE", 0))
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("OPENAI_EMBEDDING_MAX_CONCURRENCY", 4))
+EMBEDDING_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_EMBEDDING_TOKENS_PER_MINUTE", 0))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 6))
+# Rough token estimate for budgeting, the exact count is not worth a tokenizer pass per call
+CHARS_PER_TOKEN = 4
+
+# One limiter per API, shared by every client in the process
+completion_limiter = RateLimiter("completion", COMPLETION_MAX_CONCURRENCY, COMPLETION_TOKENS_PER_MINUTE, OPENAI_MAX_RETRIES)
+embedding_limiter = RateLimiter("embedding", EMBEDDING_MAX_CONCURRENCY, EMBEDDING_TOKENS_PER_MINUTE, OPENAI_MAX_RETRIES)
+
+
+def estimate_tokens(texts: List[str]) -> int:
+    return sum(len(text) for text in texts) // CHARS_PER_TOKEN + len(texts)
+
+
+class RateLimitedOpenAI(OpenAI):
+    """OpenAI completions routed through the shared completion limiter.
+
+    The client's own retries are disabled so that failures reach the limiter, which retries
+    rate limits and transient errors, and on 429s lowers the concurrency for every caller
+    instead of each retrying alone.
+    """
+
+    max_retries: int = 0
+
+    def _budget(self, prompts: List[str], kwargs: Any) -> int:
+        return estimate_tokens(prompts) + max(0, kwargs.get("max_tokens", self.max_tokens)) * len(prompts)
+
+    def _generate(
+        self,
+        prompts: List[str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> LLMResult:
+        return completion_limiter.call(
+            lambda: super(RateLimitedOpenAI, self)._generate(prompts, stop, run_manager, **kwargs),
+            self._budget(prompts, kwargs)
+        )
+
+    async def _agenerate(
+        self,
+        prompts: List[str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> LLMResult:
+        if self.streaming:
+            # Generated through `_astream`, which is limited already
+            return await super()._agenerate(prompts, stop, run_manager, **kwargs)
+        return await completion_limiter.acall(
+            lambda: super(RateLimitedOpenAI, self)._agenerate(prompts, stop, run_manager, **kwargs),
+            self._budget(prompts, kwargs)
+        )
+
+    async def _astream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[GenerationChunk]:
+        async for chunk in completion_limiter.astream(
+            lambda: super(RateLimitedOpenAI, self)._astream(prompt, stop, run_manager, **kwargs),
+            self._budget([prompt], kwargs)
+        ):
+            yield chunk
+
+
+class RateLimitedEmbeddings(Embeddings):
+    """Route an embedding client through the shared embedding limiter. Its `model` is the wrapped one's."""
+
+    def __init__(self, embeddings: Embeddings, limiter: RateLimiter = embedding_limiter) -> None:
+        self.embeddings = embeddings
+        self.limiter = limiter
+
+    @property
+    def model(self) -> str:
+        return getattr(self.embeddings, "model", type(self.embeddings).__name__)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.limiter.call(lambda: self.embeddings.embed_documents(texts), estimate_tokens(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.limiter.call(lambda: self.embeddings.embed_query(text), estimate_tokens([text]))
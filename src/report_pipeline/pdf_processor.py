@@ -1,18 +1,59 @@
+import hashlib
+import json
+import logging
 import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import List, Dict, Optional
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from dotenv import load_dotenv
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from llmsherpa.readers import LayoutPDFReader, Block, Paragraph, Section, Table, ListItem
 from llmsherpa.readers import Document as SherpaDocument
 
+from report_pipeline.embedding_backends import EmbeddingBackend, create_embeddings, embedding_backend_id
+from report_pipeline.lexical_index import LexicalIndex
+from report_pipeline.utils.embedding_cache import CachedEmbeddings
+from report_pipeline.utils.metrics import RETRIEVED_BLOCKS, record_cache_hit, span
+from report_pipeline.utils.parse_cache import ParseCache
+from report_pipeline.utils.search_results import SearchResults
+
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLLECTION_NAME = "document_content"
+DEFAULT_PERSIST_DIRECTORY = f"./{DEFAULT_COLLECTION_NAME}_db"
+EMBEDDING_CACHE_DIR = "./embedding_cache_db"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", EmbeddingBackend.OPENAI.value)
+EMBEDDING_STORAGE_DTYPE = os.getenv("EMBEDDING_STORAGE_DTYPE", "float32")
+EMBEDDING_BATCH_SIZE = 64
+MAX_RETRIEVED_BLOCKS = int(os.getenv("MAX_RETRIEVED_BLOCKS", 20))
+MAX_RETRIEVED_SECTIONS = int(os.getenv("MAX_RETRIEVED_SECTIONS", 0))
+SECTION_COLLECTION_SUFFIX = "_sections"
+SECTION_SUMMARY_CHARS = 1500
+DATA_DIR = "./data"
+PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR", "./parse_cache")
+DEFAULT_DOCUMENT_ID = "2023-annual-report"
+
+DOCUMENT_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+YEAR_PATTERN = re.compile(r"(?<!\d)(?:19|20)\d{2}(?!\d)")
+
+def document_path(document_id: str) -> str:
+    return os.path.join(DATA_DIR, f"{document_id}.pdf")
+
+def infer_document_year(document_id: str) -> Optional[int]:
+    match = YEAR_PATTERN.search(document_id)
+    return int(match.group()) if match else None
+
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
     HEADER = "header"
@@ -20,118 +61,577 @@ class BlockType(Enum):
     TABLE = "table"
 
 
-@dataclass
+class RetrievalMode(str, Enum):
+    DENSE = "dense"
+    LEXICAL = "lexical"
+    HYBRID = "hybrid"
+
+
+@dataclass(slots=True)
 class ContentBlock:
     block_idx: int = 0
     bbox: tuple = (0,0,0,0)
     original_text: str = ""
     processed_text: str = ""
     page_idx: int = 0
-    parent_chain: list[str] = field(default_factory=list)
+    parent_chain: str = ""
     block_type: BlockType = BlockType.PARAGRAPH
+    document_id: str = ""
+    year: Optional[int] = None
     
     def get_metadata(self) -> Dict:
-        return {
+        metadata = {
+            "document_id": self.document_id,
             "page_idx": self.page_idx,
             "parent_chain": self.parent_chain,
             "block_idx": self.block_idx,
             "block_type": self.block_type.value
         }
+        if self.year is not None:
+            metadata["year"] = self.year
+        return metadata
+    
+    @property
+    def block_id(self) -> str:
+        """Stable ID from position and content, namespaced by document: an unchanged block keeps its ID across reindexes."""
+        key = json.dumps([self.block_type.value, self.page_idx, self.block_idx, self.parent_chain, self.processed_text])
+        return f"{self.document_id}:{hashlib.sha256(key.encode('utf-8')).hexdigest()}"
+
+@dataclass(slots=True)
+class SectionSummary:
+    """Extractive summary of one section: its heading path followed by the start of its blocks' text."""
+    parent_chain: str = ""
+    text: str = ""
+    block_idx: int = 0  # First block of the section, also its key in SearchResults
+    page_idx: int = 0
+    block_count: int = 0
+    document_id: str = ""
+    year: Optional[int] = None
+    
+    def get_metadata(self) -> Dict:
+        metadata = {
+            "document_id": self.document_id,
+            "page_idx": self.page_idx,
+            "parent_chain": self.parent_chain,
+            "block_idx": self.block_idx,
+            "block_count": self.block_count
+        }
+        if self.year is not None:
+            metadata["year"] = self.year
+        return metadata
+    
+    @property
+    def section_id(self) -> str:
+        key = json.dumps([self.parent_chain, self.text])
+        return f"{self.document_id}:{hashlib.sha256(key.encode('utf-8')).hexdigest()}"
+
+class SectionSummarizer:
+    """Build section summaries from a stream of blocks, keeping at most `max_chars` of text per section."""
+    def __init__(self, max_chars: int = SECTION_SUMMARY_CHARS) -> None:
+        self.max_chars = max_chars
+        self._sections: Dict[Tuple[str, str], SectionSummary] = {}
+    
+    def add(self, block: ContentBlock) -> None:
+        key = (block.document_id, block.parent_chain)
+        section = self._sections.get(key)
+        if section is None:
+            section = self._sections[key] = SectionSummary(
+                parent_chain=block.parent_chain,
+                text=f"{block.parent_chain or block.document_id}\n",
+                block_idx=block.block_idx,
+                page_idx=block.page_idx,
+                document_id=block.document_id,
+                year=block.year
+            )
+        elif block.block_idx < section.block_idx:
+            section.block_idx = block.block_idx
+            section.page_idx = block.page_idx
+        
+        section.block_count += 1
+        remaining = self.max_chars - len(section.text)
+        if remaining > 0:
+            separator = "" if section.block_count == 1 else " "
+            section.text += (separator + block.processed_text.strip())[:remaining]
+    
+    def summaries(self) -> List[SectionSummary]:
+        return list(self._sections.values())
+
+@lru_cache(maxsize=None)
+def get_embedding_function() -> CachedEmbeddings:
+    """Process-wide embedding function, so the in-memory cache is shared by every store."""
+    return CachedEmbeddings(
+        create_embeddings(EmbeddingBackend(EMBEDDING_BACKEND)),
+        cache_dir=EMBEDDING_CACHE_DIR,
+        storage_dtype=EMBEDDING_STORAGE_DTYPE
+    )
 
 class VectorStoreManager:
-    def __init__(self) -> None:
-        self.embedding_function = OpenAIEmbeddings(
-            openai_api_key=os.getenv("OPENAI_API_KEY")
-        )
+    def __init__(
+        self,
+        collection_name: str = DEFAULT_COLLECTION_NAME,
+        persist_directory: str = DEFAULT_PERSIST_DIRECTORY,
+        embedding_function: Optional[Embeddings] = None,
+        index_sections: bool = MAX_RETRIEVED_SECTIONS > 0
+    ) -> None:
+        self.embedding_function = embedding_function or get_embedding_function()
+        self.collection_name = collection_name
+        self.persist_directory = persist_directory
+        # Section summaries cost embedding calls at ingestion and are only read by two-stage retrieval
+        self.index_sections = index_sections
         
-        self.create_collection("document_content")
+        self.create_collection(collection_name)
     
     def create_collection(self, collection_name: str) -> None:
-        self.vector_store =  Chroma(
+        backend_id = embedding_backend_id(self.embedding_function)
+        self.vector_store = self._open_chroma(collection_name, backend_id)
+        self.lexical_index = LexicalIndex(os.path.join(self.persist_directory, f"{collection_name}_lexical"))
+        
+        # One summary per section, searched first to narrow block retrieval to the relevant sections
+        section_collection_name = f"{collection_name}{SECTION_COLLECTION_SUFFIX}"
+        self.section_store = self._open_chroma(section_collection_name, backend_id)
+        self.section_lexical_index = LexicalIndex(os.path.join(self.persist_directory, f"{section_collection_name}_lexical"))
+        
+        # Indexed documents with their block count and year, so listing or reindexing them does not read the corpus
+        self._documents_path = os.path.join(self.persist_directory, f"{collection_name}_documents.json")
+        self._documents = self._load_documents()
+        self._adopt_legacy_entries()
+    
+    def _open_chroma(self, collection_name: str, backend_id: str) -> Chroma:
+        store = Chroma(
             collection_name=collection_name,
             embedding_function=self.embedding_function,
-            persist_directory=f"./{collection_name}_db"
+            persist_directory=self.persist_directory,
+            collection_metadata={"embedding_backend": backend_id}
+        )
+        self._check_embedding_backend(store, backend_id)
+        return store
+    
+    def _check_embedding_backend(self, store: Chroma, backend_id: str) -> None:
+        """Vectors of different models are not comparable: refuse to query or extend a collection built by another backend."""
+        metadata = store._collection.metadata or {}
+        recorded = metadata.get("embedding_backend")
+        if recorded is None:
+            # Collections created before backends were recorded were built by the configured one
+            store._collection.modify(metadata={**metadata, "embedding_backend": backend_id})
+        elif recorded != backend_id:
+            raise ValueError(
+                f"Collection {store._collection.name} was built with {recorded} embeddings, not {backend_id}: "
+                f"switch EMBEDDING_BACKEND back, or delete {self.persist_directory} and reindex"
+            )
+    
+    def _adopt_legacy_entries(self) -> None:
+        """Tag entries written before blocks were namespaced by document, which have random IDs and no `document_id`.
+        
+        Those versions only ever indexed DEFAULT_DOCUMENT_ID, so the entries are registered as
+        that document's. Its next reindex then replaces them like any vanished block instead of
+        adding a second copy next to them. Every other entry belongs to a registered document,
+        so the collection is only scanned when the registry does not account for all of it.
+        """
+        registered = sum(document["blocks"] for document in self._documents.values())
+        if self.vector_store._collection.count() <= registered:
+            return
+        
+        entries = self.vector_store.get(include=["metadatas"])
+        legacy = [
+            (entry_id, metadata or {})
+            for entry_id, metadata in zip(entries["ids"], entries["metadatas"])
+            if not (metadata or {}).get("document_id")
+        ]
+        if not legacy:
+            return
+        
+        year = infer_document_year(DEFAULT_DOCUMENT_ID)
+        ids = [entry_id for entry_id, _ in legacy]
+        metadatas = [
+            {**metadata, "document_id": DEFAULT_DOCUMENT_ID, **({"year": year} if year is not None else {})}
+            for _, metadata in legacy
+        ]
+        self.vector_store._collection.update(ids=ids, metadatas=metadatas)
+        texts = self.vector_store.get(ids=ids, include=["documents"])
+        texts_by_id = dict(zip(texts["ids"], texts["documents"]))
+        self.lexical_index.add(ids, [texts_by_id[entry_id] for entry_id in ids], metadatas)
+        self.lexical_index.save()
+        
+        documents = dict(self._documents)
+        block_count = documents.get(DEFAULT_DOCUMENT_ID, {}).get("blocks", 0) + len(ids)
+        documents[DEFAULT_DOCUMENT_ID] = {"blocks": block_count, "year": year}
+        self._save_documents(documents)
+        logger.warning(
+            "Registered %d entries without a document_id as %s, reindex it to replace them", len(ids), DEFAULT_DOCUMENT_ID
         )
     
     def reset_store(self):
+        self.drop_collection()
+        self.create_collection(self.collection_name)
+    
+    def drop_collection(self) -> None:
         self.vector_store.delete_collection()
-        self.create_collection("document_content")
-        
-    def store_content(self, content_blocks: List[ContentBlock]) -> None:
-        texts = []
-        metadatas = []
-        for block in content_blocks:
-            texts.append(block.processed_text)
-            metadatas.append(block.get_metadata())
-        
-        self.vector_store.add_texts(
-            texts=texts,
-            metadatas=metadatas
+        self.lexical_index.drop()
+        self.section_store.delete_collection()
+        self.section_lexical_index.drop()
+        self._documents = {}
+        if os.path.exists(self._documents_path):
+            os.remove(self._documents_path)
+        
+    def store_content(
+        self,
+        document_id: str,
+        content_blocks: Iterable[ContentBlock],
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, int]:
+        """Add new or changed blocks of a document and delete its vanished ones, unchanged blocks are not re-embedded.
+        
+        `content_blocks` is consumed once as a stream, such as `PDFProcessor.iter_blocks`: new
+        blocks are embedded and written `batch_size` at a time, so only one batch is held in
+        memory. `progress` receives the number of new blocks written and found so far, each
+        batch is counted as found before it is embedded. With `index_sections`, the document's
+        section summaries are built along the way and synced the same way; without it, any
+        summaries left from an earlier ingestion are deleted. The year of its blocks is
+        recorded in the document registry for later reindexes.
+        """
+        summarizer = SectionSummarizer()
+        year = None
+        
+        def block_entries() -> Iterator[Tuple[str, str, Dict]]:
+            nonlocal year
+            for block in content_blocks:
+                if self.index_sections:
+                    summarizer.add(block)
+                year = block.year
+                yield block.block_id, block.processed_text, block.get_metadata()
+        
+        stats = self._sync_entries(self.vector_store, self.lexical_index, document_id, block_entries(), batch_size, progress)
+        
+        with span("ingestion.sections") as attributes:
+            section_entries = ((section.section_id, section.text, section.get_metadata()) for section in summarizer.summaries())
+            attributes.update(self._sync_entries(self.section_store, self.section_lexical_index, document_id, section_entries, batch_size))
+        
+        documents = dict(self._documents)
+        block_count = stats["added"] + stats["unchanged"]
+        if block_count:
+            documents[document_id] = {"blocks": block_count, "year": year}
+        else:
+            documents.pop(document_id, None)
+        self._save_documents(documents)
+        
+        return stats
+    
+    @staticmethod
+    def _sync_entries(
+        store: Chroma,
+        lexical_index: LexicalIndex,
+        document_id: str,
+        entries: Iterable[Tuple[str, str, Dict]],
+        batch_size: int,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, int]:
+        """Make the document's entries in `store` and `lexical_index` match the (ID, text, metadata) `entries` stream."""
+        with span("ingestion.diff"):
+            existing_ids = set(store.get(where={"document_id": document_id}, include=[])["ids"])
+        
+        seen_ids = set()
+        batch: List[Tuple[str, str, Dict]] = []
+        added = 0
+        
+        def flush() -> None:
+            nonlocal added
+            ids, texts, metadatas = (list(column) for column in zip(*batch))
+            if progress is not None:
+                progress(added, added + len(ids))
+            with span("ingestion.embed_and_store", blocks=len(ids)):
+                store.add_texts(texts=texts, metadatas=metadatas, ids=ids)
+            lexical_index.add(ids, texts, metadatas)
+            added += len(ids)
+            batch.clear()
+            if progress is not None:
+                progress(added, added)
+        
+        for entry_id, text, metadata in entries:
+            if entry_id in seen_ids:
+                continue
+            seen_ids.add(entry_id)
+            if entry_id in existing_ids:
+                continue
+            batch.append((entry_id, text, metadata))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        
+        vanished_ids = list(existing_ids - seen_ids)
+        if vanished_ids:
+            store.delete(ids=vanished_ids)
+            lexical_index.delete(vanished_ids)
+        
+        if added or vanished_ids:
+            with span("ingestion.lexical_index", added=added, deleted=len(vanished_ids)):
+                lexical_index.save()
+        
+        return {
+            "added": added,
+            "deleted": len(vanished_ids),
+            "unchanged": len(seen_ids) - added
+        }
+        
+    def list_documents(self) -> List[str]:
+        return sorted(self._documents)
+    
+    def document_year(self, document_id: str) -> Optional[int]:
+        """Year the document was indexed with, None when it has none or is not indexed."""
+        return self._documents.get(document_id, {}).get("year")
+    
+    def _load_documents(self) -> Dict[str, Dict]:
+        if not os.path.exists(self._documents_path):
+            return {}
+        with open(self._documents_path) as f:
+            return json.load(f)
+    
+    def _save_documents(self, documents: Dict[str, Dict]) -> None:
+        os.makedirs(self.persist_directory, exist_ok=True)
+        tmp_path = f"{self._documents_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(documents, f, sort_keys=True)
+        os.replace(tmp_path, self._documents_path)
+        # Swapped whole, readers never see a half-updated registry
+        self._documents = documents
+    
+    @staticmethod
+    def document_filter(document_id: Optional[str] = None, year: Optional[int] = None) -> Optional[Dict]:
+        """Chroma `where` clause restricting retrieval to one document and/or year."""
+        conditions = []
+        if document_id is not None:
+            conditions.append({"document_id": document_id})
+        if year is not None:
+            conditions.append({"year": year})
+        
+        if not conditions:
+            return None
+        if len(conditions) == 1:
+            return conditions[0]
+        return {"$and": conditions}
+    
+    @staticmethod
+    def section_filter(filter: Optional[Dict], sections: List[Document]) -> Dict:
+        """Narrow `filter` to the blocks of the given sections, matched on their document and `parent_chain`."""
+        chains_by_document: Dict[str, List[str]] = {}
+        for section in sections:
+            chains_by_document.setdefault(section.metadata["document_id"], []).append(section.metadata["parent_chain"])
+        
+        clauses = [
+            {"$and": [{"document_id": document_id}, {"parent_chain": {"$in": chains}}]}
+            for document_id, chains in chains_by_document.items()
+        ]
+        section_clause = clauses[0] if len(clauses) == 1 else {"$or": clauses}
+        return section_clause if filter is None else {"$and": [filter, section_clause]}
+        
+    def retrieve_content(self, query: str, filter: Optional[Dict[str, str]] = None, mode: RetrievalMode = RetrievalMode.HYBRID) -> List[Document]:
+        return self.retrieve_content_batch([query], k=4, filter=filter, mode=mode, max_blocks=4)
+    
+    def retrieve_content_batch(
+        self,
+        queries: List[str],
+        k: int = 4,
+        filter: Optional[Dict[str, str]] = None,
+        mode: RetrievalMode = RetrievalMode.HYBRID,
+        max_blocks: Optional[int] = MAX_RETRIEVED_BLOCKS,
+        max_sections: int = MAX_RETRIEVED_SECTIONS
+    ) -> List[Document]:
+        """Run every query against the dense and/or lexical index and return the best fused blocks.
+        
+        Dense lookups embed all queries in one request and run concurrently. Every ranked list
+        (per query and per index) is fused by reciprocal rank into at most `max_blocks` blocks.
+        
+        With `max_sections` (off by default), each query first selects its best sections from
+        the section index and then only searches the blocks inside them. This costs a second
+        search per query and a filtered vector search, which is slower than one flat search at
+        the corpus sizes measured so far. Queries matching no section search all blocks.
+        """
+        if not queries:
+            return []
+        
+        query_embeddings = None
+        if mode != RetrievalMode.LEXICAL:
+            with span("retrieval.embed_queries", queries=len(queries)):
+                query_embeddings = self.embedding_function.embed_documents(queries)
+        
+        filters = [filter] * len(queries)
+        if max_sections:
+            with span("retrieval.select_sections", queries=len(queries)) as attributes:
+                lexical_sections, dense_sections = self._search(
+                    self.section_store, self.section_lexical_index, "retrieval.sections",
+                    queries, query_embeddings, max_sections, filters, mode
+                )
+                sections_per_query = []
+                for i in range(len(queries)):
+                    section_results = SearchResults(max_results=max_sections)
+                    section_results.add_ranked(lexical_sections[i])
+                    section_results.add_ranked(dense_sections[i])
+                    sections_per_query.append(section_results.get_results())
+                filters = [
+                    self.section_filter(filter, sections) if sections else filter
+                    for sections in sections_per_query
+                ]
+                attributes["sections"] = sum(len(sections) for sections in sections_per_query)
+        
+        lexical_results, dense_results = self._search(
+            self.vector_store, self.lexical_index, "retrieval",
+            queries, query_embeddings, k, filters, mode
         )
         
-    def retrieve_content(self, query: str, filter: Optional[Dict[str, str]] = None) -> List[Document]:
-        return self.vector_store.similarity_search(query, k=4, filter=filter)
+        search_results = SearchResults(max_results=max_blocks)
+        for ranked_docs in lexical_results + dense_results:
+            search_results.add_ranked(ranked_docs)
+        
+        with span("retrieval.fuse"):
+            docs = search_results.get_results()
+        RETRIEVED_BLOCKS.labels(mode=mode.value).observe(len(docs))
+        return docs
+    
+    @staticmethod
+    def _search(
+        store: Chroma,
+        lexical_index: LexicalIndex,
+        stage: str,
+        queries: List[str],
+        query_embeddings: Optional[List[List[float]]],
+        k: int,
+        filters: List[Optional[Dict]],
+        mode: RetrievalMode
+    ) -> Tuple[List[List[Document]], List[List[Document]]]:
+        """Ranked lexical and dense results of every query, each list empty when `mode` skips that index."""
+        lexical_results: List[List[Document]] = [[] for _ in queries]
+        dense_results: List[List[Document]] = [[] for _ in queries]
+        
+        if mode != RetrievalMode.DENSE:
+            with span(f"{stage}.lexical_search", queries=len(queries)):
+                ranked_ids = [
+                    [entry_id for entry_id, _ in lexical_index.search(query, k=k, filter=filter)]
+                    for query, filter in zip(queries, filters)
+                ]
+                # The index only holds postings: fetch the texts of every hit in one lookup
+                hit_ids = list(dict.fromkeys(entry_id for ids in ranked_ids for entry_id in ids))
+                docs_by_id = {}
+                if hit_ids:
+                    hits = store.get(ids=hit_ids, include=["documents", "metadatas"])
+                    docs_by_id = {
+                        entry_id: (text, metadata)
+                        for entry_id, text, metadata in zip(hits["ids"], hits["documents"], hits["metadatas"])
+                    }
+                for i, ids in enumerate(ranked_ids):
+                    lexical_results[i] = [
+                        Document(page_content=docs_by_id[entry_id][0], metadata=dict(docs_by_id[entry_id][1]))
+                        for entry_id in ids if entry_id in docs_by_id
+                    ]
+        
+        if mode != RetrievalMode.LEXICAL:
+            with span(f"{stage}.vector_search", queries=len(queries)), ThreadPoolExecutor(max_workers=min(len(queries), 8)) as executor:
+                results = executor.map(
+                    lambda embedding, filter: store.similarity_search_by_vector(embedding, k=k, filter=filter),
+                    query_embeddings,
+                    filters
+                )
+                dense_results = list(results)
+        
+        return lexical_results, dense_results
     
 
 
 class PDFProcessor:
-    def __init__(self):
-        self.pdf_reader = LayoutPDFReader(os.getenv("LLMSHERPA_ENDPOINT"))
-        
-        self.all_chunks: Dict[int, Block]= {}
-        self.paragraphs: List[Paragraph]= []
-        self.headers: List[Section]= []
-        self.list_items: List[ListItem] = []
-        self.tables: List[Table] = []
-        
-        self.content_blocks: List[ContentBlock] = []
+    """Turn a PDF into content blocks, streamed in reading order.
+    
+    `iter_blocks` yields every block as soon as it is built: paragraphs and tables as they
+    are visited, runs of consecutive list items merged into one block when the run ends.
+    Apart from the Sherpa document itself, only the current list run is held in memory.
+    """
+    def __init__(self, parse_cache: Optional[ParseCache] = None, pdf_reader: Optional[LayoutPDFReader] = None):
+        self.pdf_reader = pdf_reader or LayoutPDFReader(os.getenv("LLMSHERPA_ENDPOINT"))
+        self.parse_cache = parse_cache or ParseCache(PARSE_CACHE_DIR)
         
+        self.block_counts: Counter = Counter()
     
-    def extract_text(self, pdf_path: str) -> List[ContentBlock]:
+    def extract_text(self, pdf_path: str, document_id: Optional[str] = None, year: Optional[int] = None) -> List[ContentBlock]:
         """Extract and process different types of content from PDF."""
-        doc = self.pdf_reader.read_pdf(pdf_path)
+        return list(self.iter_blocks(pdf_path, document_id=document_id, year=year))
+    
+    def iter_blocks(self, pdf_path: str, document_id: Optional[str] = None, year: Optional[int] = None) -> Iterator[ContentBlock]:
+        document_id = document_id or os.path.splitext(os.path.basename(pdf_path))[0]
+        yield from self.iter_document_blocks(self.read_document(pdf_path), document_id, year)
+    
+    def iter_document_blocks(self, doc: SherpaDocument, document_id: str, year: Optional[int] = None) -> Iterator[ContentBlock]:
+        """Blocks of an already read document, which can be walked again without reading it again."""
+        year = year if year is not None else infer_document_year(document_id)
+        self.block_counts = Counter(sections=len(doc.sections()))
         
-        self._categorize_document_blocks(doc)
-        self._process_paragraphs()
-        self._process_list_items()
-        self._process_tables()
+        for block in self._iter_document_blocks(doc):
+            block.document_id = document_id
+            block.year = year
+            yield block
+    
+    def read_document(self, pdf_path: str) -> SherpaDocument:
+        """Rebuild the Sherpa document from the parse cache, only unseen PDFs go to LLMSherpa."""
+        content_hash = ParseCache.content_hash(pdf_path)
         
-        return self.content_blocks
+        blocks_json = self.parse_cache.load(content_hash)
+        record_cache_hit("parse", blocks_json is not None)
+        if blocks_json is not None:
+            return SherpaDocument(blocks_json)
+        return self._parse_layout(pdf_path, content_hash)
+    
+    def cache_layout(self, pdf_path: str) -> None:
+        """Make sure the PDF's layout is in the parse cache, without building the Sherpa document of a cached one."""
+        content_hash = ParseCache.content_hash(pdf_path)
+        cached = self.parse_cache.contains(content_hash)
+        record_cache_hit("parse", cached)
+        if not cached:
+            self._parse_layout(pdf_path, content_hash)
+    
+    def _parse_layout(self, pdf_path: str, content_hash: str) -> SherpaDocument:
+        with span("ingestion.layout_parse"):
+            doc = self.pdf_reader.read_pdf(pdf_path)
+        self.parse_cache.store(content_hash, doc.json)
+        return doc
     
     def document_stats(self):
-        print(f"All chunks: {len(self.all_chunks)}")
-        print(f"Paragraphs: {len(self.paragraphs)}")
-        print(f"List items: {len(self.list_items)}")
-        print(f"Tables: {len(self.tables)}")        
-        print(f"Sections: {len(self.headers)}")        
+        logger.info(
+            "Paragraphs: %d, list items: %d, tables: %d, sections: %d",
+            self.block_counts["paragraphs"], self.block_counts["list_items"], self.block_counts["tables"], self.block_counts["sections"]
+        )
     
-    def _categorize_document_blocks(self, document: SherpaDocument):
+    def _iter_document_blocks(self, document: SherpaDocument) -> Iterator[ContentBlock]:
+        """Walk the chunks in reading order; a list run ends at the first chunk that does not directly follow it."""
+        current_list: List[ListItem] = []
+        
         chunk : Block
         for chunk in document.chunks():
+            if current_list and not (chunk.tag == "list_item" and chunk.block_idx == current_list[-1].block_idx + 1):
+                yield self._aggregate_list_items(current_list)
+                current_list = []
+            
             if chunk.tag == "para":
-                self.paragraphs.append(chunk)
+                self.block_counts["paragraphs"] += 1
+                yield self._process_paragraph(chunk)
             elif chunk.tag == "list_item":
-                self.list_items.append(chunk)
+                self.block_counts["list_items"] += 1
+                current_list.append(chunk)
             elif chunk.tag == "table":
-                self.tables.append(chunk)
-                
-        section : Section
-        for section in document.sections():
-            self.headers.append(section)
-    
-    def _process_paragraphs(self):
-        for para in self.paragraphs:
-            merged_text_content = self._merge_sentences(para)
-            block = ContentBlock(
-                block_idx = para.block_idx,
-                bbox = para.bbox,
-                block_type = BlockType.PARAGRAPH,
-                original_text = merged_text_content,
-                processed_text = self._sanitize_text(merged_text_content),
-                page_idx=para.page_idx,
-                parent_chain=self._format_parent_chain(para)
-            )
-            self.content_blocks.append(block)    
+                self.block_counts["tables"] += 1
+                yield self._process_table(chunk)
+        
+        if current_list:
+            yield self._aggregate_list_items(current_list)
+    
+    def _process_paragraph(self, para: Paragraph) -> ContentBlock:
+        merged_text_content = self._merge_sentences(para)
+        return ContentBlock(
+            block_idx = para.block_idx,
+            bbox = tuple(para.bbox),
+            block_type = BlockType.PARAGRAPH,
+            original_text = merged_text_content,
+            processed_text = self._sanitize_text(merged_text_content),
+            page_idx=para.page_idx,
+            parent_chain=self._format_parent_chain(para)
+        )
     
     @staticmethod
     def _sanitize_text(text: str) -> str:
@@ -144,34 +644,8 @@ class PDFProcessor:
     @staticmethod
     def _format_parent_chain(block: Block) -> str:
         ancestors = [a.title for a in block.parent_chain() if isinstance(a, Section)]
-        return " > ".join(ancestors)
-    
-    def _process_list_items(self):
-        self.list_items.sort(key=lambda x: x.block_idx)
-        
-        current_list : List[ListItem] = []
-        processed_lists : List[ContentBlock] = []
-        
-        for item in self.list_items:
-            if not current_list:
-                current_list.append(item)
-            else:
-                prev_idx = current_list[-1].block_idx
-                curr_idx = item.block_idx
-                
-                if curr_idx == prev_idx + 1:
-                    current_list.append(item)
-                else:
-                    processed_lists.append(self._aggregate_list_items(current_list))
-                    current_list = [item]
-        
-        if current_list:
-            processed_lists.append(self._aggregate_list_items(current_list))
-        
-        for p_l in processed_lists:
-            self.content_blocks.append(p_l)
-        
-        return processed_lists
+        # Every block of a section carries the same chain, keep a single copy of it
+        return sys.intern(" > ".join(ancestors))
         
     def _aggregate_list_items(self, items: List[ListItem]) -> ContentBlock:
         """Combine list items into a single entry. Add context"""
@@ -188,32 +662,20 @@ class PDFProcessor:
         block.page_idx = min([item.page_idx for item in items])
         block.parent_chain = self._format_parent_chain(items[0])
         
-        text = ""
-        for item in items:
-            text += " ".join(item.sentences)
-            text += "\n"
+        text = "".join(" ".join(item.sentences) + "\n" for item in items)
         
         block.original_text = text
         block.processed_text = self._sanitize_text(text)
         
         return block
         
-    def _process_tables(self):
-        for table in self.tables:
-            block = ContentBlock(
-                block_idx = table.block_idx,
-                bbox = table.bbox,
-                block_type = BlockType.TABLE,
-                original_text = table.to_html(),
-                processed_text = table.to_text(), # Markdown format
-                page_idx=table.page_idx,
-                parent_chain=self._format_parent_chain(table)
-            )
-            self.content_blocks.append(block)
-    
-
-    
-    
-    
-    
-    
\ No newline at end of file
+    def _process_table(self, table: Table) -> ContentBlock:
+        return ContentBlock(
+            block_idx = table.block_idx,
+            bbox = tuple(table.bbox),
+            block_type = BlockType.TABLE,
+            original_text = table.to_html(),
+            processed_text = table.to_text(), # Markdown format
+            page_idx=table.page_idx,
+            parent_chain=self._format_parent_chain(table)
+        )
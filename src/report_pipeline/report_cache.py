@@ -0,0 +1,137 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from report_pipeline.report_generator import Presentation, ReportType
+from report_pipeline.utils.search_results import SearchResults
+
+
+CORPUS_VERSION_FILE = "CORPUS_VERSION"
+
+
+class ReportCache:
+    """TTL/LRU cache of generated presentations, optionally persisted to `cache_dir`.
+
+    Keys combine the report type, the generator's prompt version, the corpus version and a
+    fingerprint of the retrieved blocks. Bumping the corpus version after a reindex makes
+    every earlier entry unreachable.
+    """
+
+    def __init__(self, max_entries: int = 128, ttl_seconds: float = 24 * 3600, cache_dir: Optional[str] = None) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = cache_dir
+
+        self._entries: OrderedDict[str, Tuple[float, Presentation]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        self.corpus_version = self._load_corpus_version()
+
+    def make_key(self, report_type: ReportType, prompt_version: str, documents: List[Document]) -> str:
+        block_keys = sorted({str(SearchResults.document_key(doc)) for doc in documents})
+        fingerprint = hashlib.sha256("\n".join(block_keys).encode("utf-8")).hexdigest()
+        raw_key = f"{report_type.value}:{prompt_version}:{self.corpus_version}:{fingerprint}"
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Presentation]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None:
+            entry = self._read_entry(key)
+            if entry is None:
+                return None
+            self._remember(key, entry)
+
+        created_at, presentation = entry
+        if time.time() - created_at > self.ttl_seconds:
+            self._forget(key)
+            return None
+
+        return presentation.model_copy(deep=True)
+
+    def put(self, key: str, presentation: Presentation) -> None:
+        entry = (time.time(), presentation.model_copy(deep=True))
+        self._remember(key, entry)
+        self._write_entry(key, entry)
+
+    def bump_corpus_version(self) -> int:
+        """Invalidate every cached report, to be called once the indexed corpus changed."""
+        with self._lock:
+            self.corpus_version += 1
+            self._entries.clear()
+
+        if self.cache_dir:
+            for path in glob.glob(os.path.join(self.cache_dir, "*.json")):
+                self._remove_file(path)
+            self._write_atomic(os.path.join(self.cache_dir, CORPUS_VERSION_FILE), str(self.corpus_version))
+
+        return self.corpus_version
+
+    def _remember(self, key: str, entry: Tuple[float, Presentation]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._remove_entry_file(evicted_key)
+
+    def _forget(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+        self._remove_entry_file(key)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_entry(self, key: str) -> Optional[Tuple[float, Presentation]]:
+        if not self.cache_dir or not os.path.exists(self._entry_path(key)):
+            return None
+        with open(self._entry_path(key)) as f:
+            payload = json.load(f)
+        return payload["created_at"], Presentation.model_validate(payload["presentation"])
+
+    def _write_entry(self, key: str, entry: Tuple[float, Presentation]) -> None:
+        if not self.cache_dir:
+            return
+        created_at, presentation = entry
+        payload = {"created_at": created_at, "presentation": presentation.model_dump()}
+        self._write_atomic(self._entry_path(key), json.dumps(payload))
+
+    def _remove_entry_file(self, key: str) -> None:
+        if self.cache_dir:
+            self._remove_file(self._entry_path(key))
+
+    def _load_corpus_version(self) -> int:
+        if not self.cache_dir:
+            return 0
+        path = os.path.join(self.cache_dir, CORPUS_VERSION_FILE)
+        if not os.path.exists(path):
+            return 0
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _write_atomic(path: str, content: str) -> None:
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
@@ -1,18 +1,67 @@
 from enum import Enum
+import asyncio
+import hashlib
+import logging
 import os
-from typing import Dict, List, Literal
+from typing import AsyncIterator, Dict, List, Literal, Optional
 from dotenv import load_dotenv
-from abc import ABC, abstractmethod
+from abc import ABC
 
-from langchain_openai import OpenAI
 from langchain_core.documents import Document
+from langchain_core.exceptions import OutputParserException
 from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import PromptTemplate
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
+
+from report_pipeline.openai_clients import RateLimitedOpenAI
+from report_pipeline.utils.context_packing import ContextPacker
+from report_pipeline.utils.metrics import LLMUsageHandler, span
+from report_pipeline.utils.stream_parser import SlideStreamParser
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500))
+
+MAP_REDUCE_CONCURRENCY = int(os.getenv("MAP_REDUCE_CONCURRENCY", 4))
+OUTLINE_MAX_TOKENS = 400
+SLIDE_MAX_TOKENS = 600
+MAX_PARSE_RETRIES = 2
+
+REPORT_TEMPLATE_TAIL = """Data:
+            {data}
+
+            Format Instructions:
+            {format_instructions}
+            """
+
+OUTLINE_TEMPLATE_TAIL = """Before writing the report, plan its slides only. For every slide give its title, its type
+            and a one-sentence focus describing which data and insights it must cover. Do not write the slide content.
+
+            Data:
+            {data}
+
+            Format Instructions:
+            {format_instructions}
+            """
+
+SLIDE_TEMPLATE_TAIL = """The report has been planned with this outline:
+            {outline}
+
+            Write ONLY the following slide of the outline, without repeating what the other slides cover:
+            Title: {title}
+            Type: {slide_type}
+            Focus: {focus}
+
+            Data:
+            {data}
+
+            Format Instructions:
+            {format_instructions}
+            """
+
 class ReportType(str, Enum):
     CFO = "cfo"
     CEO = "ceo"
@@ -29,34 +78,190 @@ class SlideContent(BaseModel):
 class Presentation(BaseModel):
     slides: List[SlideContent]
 
+class SlideOutline(BaseModel):
+    title: str = Field(description="Slide title")
+    slide_type: Literal['summary', 'content', 'action_items'] = Field(description="Type of slide")
+    focus: str = Field(description="One sentence describing the data and insights the slide covers")
+
+class PresentationOutline(BaseModel):
+    slides: List[SlideOutline]
+
+class GenerationMode(str, Enum):
+    SINGLE = "single"
+    MAP_REDUCE = "map_reduce"
+
 
 class ReportGenerator(ABC):
-    def __init__(self):
-        self.llm = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_tokens=2000, temperature=0.4)
+    """Stateless report generator: every call returns its own Presentation, so one instance can serve concurrent requests."""
+    # Role-specific requirements, shared by the single-shot and map-reduce prompts
+    brief: str = ""
+    
+    def __init__(self, context_token_budget: Optional[int] = None):
+        self.llm = RateLimitedOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_tokens=2000, temperature=0.4)
         self.output_parser = PydanticOutputParser(pydantic_object=Presentation)
-        self.report_content: Presentation = []
-        self.presentation = None
+        self.outline_parser = PydanticOutputParser(pydantic_object=PresentationOutline)
+        self.slide_parser = PydanticOutputParser(pydantic_object=SlideContent)
+        self.prompt = self.build_prompt()
+        self.outline_prompt = PromptTemplate(
+            template=self.brief + OUTLINE_TEMPLATE_TAIL,
+            input_variables=["data"],
+            partial_variables={"format_instructions": self.outline_parser.get_format_instructions()}
+        )
+        self.slide_prompt = PromptTemplate(
+            template=self.brief + SLIDE_TEMPLATE_TAIL,
+            input_variables=["data", "outline", "title", "slide_type", "focus"],
+            partial_variables={"format_instructions": self.slide_parser.get_format_instructions()}
+        )
+        
+        self.context_packer = ContextPacker(token_budget=context_token_budget or CONTEXT_TOKEN_BUDGET, model_name=self.llm.model_name)
+        self.context_packer.fit_to_context(self.prompt.format(data=""), self.llm.max_context_size, self.llm.max_tokens)
+        self.llm.callbacks = [LLMUsageHandler(type(self).__name__, self.llm.model_name, self.context_packer.count_tokens)]
+        
+        self.prompt_versions = {
+            GenerationMode.SINGLE: self._hash_prompts(self.prompt),
+            GenerationMode.MAP_REDUCE: self._hash_prompts(self.outline_prompt, self.slide_prompt)
+        }
     
-    def create_report(self, data: List[Document]) -> None:
+    def create_report(self, data: List[Document]) -> Presentation:
         """Create complete report with all sections."""
+        return self._post_process_content(self.generate_report_content(data))
+    
+    async def acreate_report(self, data: List[Document]) -> Presentation:
+        """Async variant of `create_report`, keeps the event loop free during the completion."""
+        return self._post_process_content(await self.agenerate_report_content(data))
+    
+    async def acreate_report_from_context(self, context: str) -> Presentation:
+        """Create the report from an already condensed context, such as a shared fact sheet."""
+        chain = self.prompt | self.llm
+        with span("generation.llm"):
+            result = await chain.ainvoke({"data": context})
+        return self._post_process_content(self._parse_result(result))
 
-        self.report_content = self.generate_report_content(data)
-        self.report_content = self._post_process_content()
+    async def astream_report(self, data: List[Document]) -> AsyncIterator[SlideContent]:
+        """Yield each post-processed slide as soon as the streamed completion contains it."""
+        chain = self.prompt | self.llm
+        prompt_input = self._prompt_input(data)
+        stream_parser = SlideStreamParser()
+        with span("generation.llm_stream") as attributes:
+            async for chunk in chain.astream(prompt_input):
+                for raw_slide in stream_parser.feed(chunk):
+                    yield self._post_process_slide(SlideContent.model_validate(raw_slide))
+            attributes["slides"] = stream_parser.slides_emitted
+        
+        if not stream_parser.slides_emitted:
+            # Not the expected JSON layout, let the output parser handle (or reject) it
+            for slide in self._parse_result(stream_parser.text).slides:
+                yield self._post_process_slide(slide)
 
-    @abstractmethod
+    async def acreate_report_map_reduce(self, data: List[Document], max_concurrency: int = MAP_REDUCE_CONCURRENCY) -> Presentation:
+        """Plan the slide outline, then generate every slide concurrently and assemble the presentation."""
+        return Presentation(slides=[slide async for slide in self.astream_report_map_reduce(data, max_concurrency)])
+    
+    async def astream_report_map_reduce(self, data: List[Document], max_concurrency: int = MAP_REDUCE_CONCURRENCY) -> AsyncIterator[SlideContent]:
+        """Generate the slides of the outline concurrently, yielding each in outline order once it and the ones before it are done.
+        
+        Latency is bounded by the slowest slide rather than the whole deck, and a malformed
+        completion only retries the affected slide. When a slide fails for good, or the
+        consumer stops early, the slides still being generated are cancelled.
+        """
+        prompt_input = self._prompt_input(data)
+        
+        outline_chain = self.outline_prompt | self.llm.bind(max_tokens=OUTLINE_MAX_TOKENS)
+        outline = await self._ainvoke_parsed(outline_chain, prompt_input, self.outline_parser)
+        outline_text = "\n".join(f"{i}. [{item.slide_type}] {item.title}: {item.focus}" for i, item in enumerate(outline.slides, start=1))
+        
+        slide_chain = self.slide_prompt | self.llm.bind(max_tokens=SLIDE_MAX_TOKENS)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def generate_slide(item: SlideOutline) -> SlideContent:
+            async with semaphore:
+                slide = await self._ainvoke_parsed(slide_chain, {
+                    **prompt_input,
+                    "outline": outline_text,
+                    "title": item.title,
+                    "slide_type": item.slide_type,
+                    "focus": item.focus
+                }, self.slide_parser)
+            slide.slide_type = item.slide_type
+            return self._post_process_slide(slide)
+        
+        tasks = [asyncio.create_task(generate_slide(item)) for item in outline.slides]
+        next_slide = 0
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    # Re-raise a slide that ran out of retries, the others are cancelled below
+                    task.result()
+                while next_slide < len(tasks) and tasks[next_slide].done():
+                    yield tasks[next_slide].result()
+                    next_slide += 1
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def build_prompt(self) -> PromptTemplate:
+        return PromptTemplate(
+            template=self.brief + REPORT_TEMPLATE_TAIL,
+            input_variables=["data"],
+            partial_variables={"format_instructions": self.output_parser.get_format_instructions()}
+        )
+    
     def generate_report_content(self, data: List[Document]) -> Presentation:
-        pass
+        chain = self.prompt | self.llm
+        prompt_input = self._prompt_input(data)
+        with span("generation.llm"):
+            result = chain.invoke(prompt_input)
+        return self._parse_result(result)
+    
+    async def agenerate_report_content(self, data: List[Document]) -> Presentation:
+        chain = self.prompt | self.llm
+        prompt_input = self._prompt_input(data)
+        with span("generation.llm"):
+            result = await chain.ainvoke(prompt_input)
+        return self._parse_result(result)
+    
+    def _prompt_input(self, data: List[Document]) -> Dict[str, str]:
+        with span("generation.pack_context", blocks=len(data)):
+            return {"data": self.context_packer.pack(data)}
+    
+    def _parse_result(self, result: str) -> Presentation:
+        logger.debug("%s completion:\n%s", type(self).__name__, result)
+        with span("generation.parse"):
+            return self.output_parser.parse(result)
+    
+    @staticmethod
+    async def _ainvoke_parsed(chain, prompt_input: Dict[str, str], parser: PydanticOutputParser):
+        for attempt in range(MAX_PARSE_RETRIES + 1):
+            with span("generation.llm", attempt=attempt):
+                result = await chain.ainvoke(prompt_input)
+            try:
+                with span("generation.parse"):
+                    return parser.parse(result)
+            except (OutputParserException, ValidationError):
+                logger.warning("Unparseable completion, attempt %d of %d", attempt + 1, MAX_PARSE_RETRIES + 1)
+                if attempt == MAX_PARSE_RETRIES:
+                    raise
+    
+    def _hash_prompts(self, *prompts: PromptTemplate) -> str:
+        prompt_key = "\0".join([prompt.template for prompt in prompts] + [str(self.context_packer.token_budget)])
+        return hashlib.sha256(prompt_key.encode("utf-8")).hexdigest()[:12]
+    
+    def _post_process_content(self, presentation: Presentation) -> Presentation:
+        for slide in presentation.slides:
+            self._post_process_slide(slide)
+        return presentation
     
-    def _post_process_content(self):
-        for slide in self.report_content.slides:
-            bulleted = list(map(lambda sentence: " - " + sentence if not sentence.strip().startswith("-") and not sentence.strip().endswith(":") else sentence, slide.content))
-            slide.content = bulleted
-        return self.report_content
+    @staticmethod
+    def _post_process_slide(slide: SlideContent) -> SlideContent:
+        bulleted = list(map(lambda sentence: " - " + sentence if not sentence.strip().startswith("-") and not sentence.strip().endswith(":") else sentence, slide.content))
+        slide.content = bulleted
+        return slide
 
 class CFOReportGenerator(ReportGenerator):
-    def generate_report_content(self, data: List[Document]) -> Presentation:
-        prompt = PromptTemplate(
-            template="""
+    brief = """
             Based on the following financial data, generate a CFO report designed for presentation purposes:
             
             Requirements:
@@ -79,30 +284,10 @@ class CFOReportGenerator(ReportGenerator):
             - Focus on high-impact insights rather than excessive detail.
             - Prioritize data visualization and clarity in summarizations to facilitate quick decision-making.
             
-            Data:
-            {data}
-
-            Format Instructions:
-            {format_instructions}
-            """,
-            input_variables=["data"],
-            partial_variables={"format_instructions": self.output_parser.get_format_instructions()}
-        )
-        
-        chain= prompt | self.llm
-        result = chain.invoke({"data": data})
-        
-        print("*" * 100)
-        print(result)
-        print("*" * 100)
-        
-        return self.output_parser.parse(result)
+            """
 
 class CEOReportGenerator(ReportGenerator):
-    def generate_report_content(self, data: Dict) -> Presentation:
-        
-        prompt = PromptTemplate(
-            template="""
+    brief = """
             Based on the following business data, generate a CEO report:
 
             Requirements:
@@ -125,24 +310,10 @@ class CEOReportGenerator(ReportGenerator):
                 - Use concise language that aligns with a CEO's strategic perspective.
                 - Prioritize actionable insights over granular detail, focusing on the broader business context.
             
-            Data:
-            {data}
-
-            Format Instructions:
-            {format_instructions}
-            """,
-            input_variables=["data"],
-            partial_variables={"format_instructions": self.output_parser.get_format_instructions()}
-        )
-        
-        chain = prompt | self.llm
-        result = chain.invoke({"data": data})
-        return self.output_parser.parse(result)
+            """
 
 class COOReportGenerator(ReportGenerator):
-    def generate_report_content(self, data: Dict) -> Presentation:
-        prompt = PromptTemplate(
-            template="""
+    brief = """
             Based on the following operational data, generate a COO report tailored for presentation purposes:
 
             Requirements:
@@ -167,17 +338,5 @@ class COOReportGenerator(ReportGenerator):
             - Use clear, actionable language tailored for a COO's operational focus.
             - Emphasize efficiency and execution, avoiding excessive high-level abstraction.
             
-            Data:
-            {data}
-
-            Format Instructions:
-            {format_instructions}
-            """,
-            input_variables=["data"],
-            partial_variables={"format_instructions": self.output_parser.get_format_instructions()}
-        )
-        
-        chain = prompt | self.llm
-        result = chain.invoke({"data": data})
-        return self.output_parser.parse(result)
+            """
     
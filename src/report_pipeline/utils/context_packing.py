@@ -0,0 +1,111 @@
+import logging
+from typing import List
+
+import tiktoken
+from langchain_core.documents import Document
+
+
+BLOCK_SEPARATOR = "\n\n"
+TRUNCATION_MARKER = " [...]"
+# Headroom for the tokenizer mismatch between the prompt template and the rendered prompt
+PROMPT_TOKEN_MARGIN = 64
+
+logger = logging.getLogger(__name__)
+
+
+class ApproximateEncoding:
+    """Stand-in for a tiktoken encoding when its BPE files cannot be loaded: ~4 characters per token."""
+
+    CHARS_PER_TOKEN = 4
+
+    def encode(self, text: str) -> List[str]:
+        return [text[i:i + self.CHARS_PER_TOKEN] for i in range(0, len(text), self.CHARS_PER_TOKEN)]
+
+    def decode(self, tokens: List[str]) -> str:
+        return "".join(tokens)
+
+
+class ContextPacker:
+    """Serialise retrieved blocks compactly and fill a token budget in relevance order.
+
+    Each block is rendered as a `[section path | p.N]` header followed by its text; tables
+    keep their markdown rows. Blocks are taken in the given order until the budget is used,
+    the first block that does not fit is trimmed into the remaining space and the rest is
+    dropped.
+    """
+
+    def __init__(self, token_budget: int, model_name: str = "gpt-3.5-turbo-instruct", min_block_tokens: int = 48) -> None:
+        self.token_budget = token_budget
+        self.min_block_tokens = min_block_tokens
+        try:
+            self.encoding = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # tiktoken downloads its BPE files on first use, which fails offline
+            logger.warning("Could not load the tiktoken encoding for %s, approximating token counts", model_name)
+            self.encoding = ApproximateEncoding()
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode(text))
+
+    def fit_to_context(self, prompt: str, context_size: int, completion_tokens: int) -> int:
+        """Cap the budget so `prompt` (rendered without data), the packed data and the completion fit in the model context."""
+        available = context_size - completion_tokens - self.count_tokens(prompt) - PROMPT_TOKEN_MARGIN
+        self.token_budget = max(0, min(self.token_budget, available))
+        return self.token_budget
+
+    def pack(self, documents: List[Document]) -> str:
+        separator_tokens = self.count_tokens(BLOCK_SEPARATOR)
+
+        packed: List[str] = []
+        used = 0
+        for document in documents:
+            block = self.format_block(document)
+            block_tokens = self.count_tokens(block) + (separator_tokens if packed else 0)
+            if used + block_tokens <= self.token_budget:
+                packed.append(block)
+                used += block_tokens
+                continue
+
+            remaining = self.token_budget - used - (separator_tokens if packed else 0)
+            if remaining >= self.min_block_tokens:
+                trimmed = self._trim_block(document, remaining)
+                if trimmed:
+                    packed.append(trimmed)
+            break
+
+        return BLOCK_SEPARATOR.join(packed)
+
+    @staticmethod
+    def format_header(document: Document) -> str:
+        metadata = document.metadata
+        location = [metadata.get("document_id", ""), metadata.get("parent_chain", ""), f"p.{metadata.get('page_idx', 0) + 1}"]
+        if metadata.get("block_type") == "table":
+            location.append("table")
+        return "[" + " | ".join(part for part in location if part) + "]"
+
+    def format_block(self, document: Document) -> str:
+        return f"{self.format_header(document)}\n{document.page_content.strip()}"
+
+    def _trim_block(self, document: Document, max_tokens: int) -> str:
+        header = self.format_header(document)
+        available = max_tokens - self.count_tokens(header + "\n" + TRUNCATION_MARKER)
+        if available <= 0:
+            return ""
+
+        text = document.page_content.strip()
+        if document.metadata.get("block_type") == "table":
+            # Keep whole markdown rows so the table stays readable
+            rows = []
+            for row in text.splitlines():
+                if self.count_tokens("\n".join(rows + [row])) > available:
+                    break
+                rows.append(row)
+            trimmed = "\n".join(rows)
+        else:
+            trimmed = self.encoding.decode(self.encoding.encode(text)[:available])
+
+        if not trimmed:
+            return ""
+        return f"{header}\n{trimmed}{TRUNCATION_MARKER}"
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from report_pipeline.utils.metrics import record_cache_hit, record_cache_lookup, span
+
+
+STORAGE_DTYPES = ("float32", "float16", "int8")
+
+# Stored codes and the scale that maps them back to float32
+EncodedVector = Tuple[np.ndarray, float]
+
+
+def encode_vector(vector: List[float], storage_dtype: str) -> EncodedVector:
+    """Quantize a vector for storage: float16 halves it, int8 (symmetric, one scale per vector) quarters it."""
+    array = np.asarray(vector, dtype=np.float32)
+    if storage_dtype == "int8":
+        scale = float(np.abs(array).max()) / 127 or 1.0
+        return np.round(array / scale).astype(np.int8), scale
+    return array.astype(storage_dtype), 1.0
+
+
+def decode_vector(encoded: EncodedVector) -> List[float]:
+    codes, scale = encoded
+    return (codes.astype(np.float32) * np.float32(scale)).tolist()
+
+
+class CachedEmbeddings(Embeddings):
+    """Wrap an embedding function with an in-memory LRU backed by an on-disk vector cache.
+
+    Vectors are kept as `storage_dtype` arrays in memory and on disk. A quantized dtype only
+    shrinks this cache: a cache miss returns the full-precision vector from the API, so what
+    gets written to the vector store is never degraded. Only vectors served from the cache
+    carry the quantization error.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache_dir: str, max_memory_items: int = 4096, storage_dtype: str = "float32") -> None:
+        if storage_dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported embedding storage dtype: {storage_dtype}, expected one of {', '.join(STORAGE_DTYPES)}")
+
+        self.embeddings = embeddings
+        self.model_name: str = getattr(embeddings, "model", type(embeddings).__name__)
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.storage_dtype = storage_dtype
+
+        self._memory: OrderedDict[str, EncodedVector] = OrderedDict()
+        self._lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        vectors = {key: self._get(key) for key in keys}
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if vectors[key] is None:
+                missing[key] = text
+
+        record_cache_lookup("embedding", hits=len(keys) - len(missing), misses=len(missing))
+        if missing:
+            with span("embedding.api", texts=len(missing)):
+                embedded = self.embeddings.embed_documents(list(missing.values()))
+            for key, vector in zip(missing.keys(), embedded):
+                vectors[key] = self._put(key, vector)
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        vector = self._get(key)
+        record_cache_hit("embedding", vector is not None)
+        if vector is None:
+            with span("embedding.api", texts=1):
+                vector = self._put(key, self.embeddings.embed_query(text))
+        return vector
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        if self.storage_dtype == "float32":
+            return os.path.join(self.cache_dir, f"{key}.npy")
+        return os.path.join(self.cache_dir, f"{key}.{self.storage_dtype}.npz")
+
+    def _get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            encoded = self._memory.get(key)
+            if encoded is not None:
+                self._memory.move_to_end(key)
+
+        if encoded is None:
+            encoded = self._read(key)
+            if encoded is None:
+                return None
+            self._remember(key, encoded)
+
+        return decode_vector(encoded)
+
+    def _put(self, key: str, vector: List[float]) -> List[float]:
+        """Store a quantized copy of a fresh vector and return the vector itself."""
+        encoded = encode_vector(vector, self.storage_dtype)
+
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            if self.storage_dtype == "float32":
+                np.save(f, encoded[0])
+            else:
+                np.savez(f, codes=encoded[0], scale=encoded[1])
+        os.replace(tmp_path, path)
+
+        self._remember(key, encoded)
+        return vector
+
+    def _read(self, key: str) -> Optional[EncodedVector]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        if self.storage_dtype == "float32":
+            return np.load(path), 1.0
+        with np.load(path) as stored:
+            return stored["codes"], float(stored["scale"])
+
+    def _remember(self, key: str, encoded: EncodedVector) -> None:
+        with self._lock:
+            self._memory[key] = encoded
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
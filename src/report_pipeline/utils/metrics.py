@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from langchain_community.callbacks.openai_info import OpenAICallbackHandler
+from langchain_core.outputs import LLMResult
+from prometheus_client import Counter, Gauge, Histogram
+
+
+logger = logging.getLogger(__name__)
+
+STAGE_SECONDS = Histogram(
+    "report_pipeline_stage_seconds",
+    "Duration of each pipeline stage",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+)
+LLM_TOKENS = Counter("report_pipeline_llm_tokens_total", "Tokens sent to and generated by the LLM", ["component", "kind"])
+LLM_CALL_TOKENS = Histogram(
+    "report_pipeline_llm_call_tokens",
+    "Tokens per LLM call",
+    ["component", "kind"],
+    buckets=(64, 128, 256, 512, 1024, 2048, 3072, 4096)
+)
+LLM_COST = Counter("report_pipeline_llm_cost_usd_total", "Estimated LLM cost in USD", ["component"])
+RETRIEVED_BLOCKS = Histogram(
+    "report_pipeline_retrieved_blocks",
+    "Blocks returned per retrieval",
+    ["mode"],
+    buckets=(0, 1, 2, 4, 8, 12, 16, 20, 30, 40, 60, 80)
+)
+CACHE_LOOKUPS = Counter("report_pipeline_cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"])
+COALESCED_REQUESTS = Counter("report_pipeline_coalesced_requests_total", "Requests served by an identical in-flight request", ["endpoint"])
+API_RETRIES = Counter("report_pipeline_api_retries_total", "API calls retried after a rate limit or transient error", ["client", "error"])
+CONCURRENCY_LIMIT = Gauge("report_pipeline_concurrency_limit", "Current adaptive concurrency limit", ["client"])
+
+_current_span: ContextVar[Optional[str]] = ContextVar("current_span", default=None)
+
+
+def record_cache_lookup(cache: str, hits: int = 0, misses: int = 0) -> None:
+    if hits:
+        CACHE_LOOKUPS.labels(cache=cache, result="hit").inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache=cache, result="miss").inc(misses)
+
+
+def record_cache_hit(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+@contextmanager
+def span(stage: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """Time one pipeline stage into `STAGE_SECONDS` and log it as a structured debug record.
+
+    Spans nest within a request, the record carries the path of the enclosing stages. The
+    yielded dict takes attributes only known at the end of the stage, such as result counts.
+    """
+    parent = _current_span.get()
+    path = f"{parent}/{stage}" if parent else stage
+    token = _current_span.set(path)
+    status = "ok"
+    start = time.perf_counter()
+    try:
+        yield attributes
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # An abandoned async generator is closed from another context
+            pass
+        STAGE_SECONDS.labels(stage=stage).observe(duration)
+        logger.debug(
+            "span %s %s %.1fms %s", path, status, duration * 1000, attributes,
+            extra={"span": path, "stage": stage, "status": status, "duration_ms": duration * 1000, "span_attributes": attributes}
+        )
+
+
+class LLMUsageHandler(OpenAICallbackHandler):
+    """Export the token usage and cost of every completion of one component to Prometheus.
+
+    Streamed completions come back without usage, their tokens are counted with `count_tokens`.
+    """
+
+    def __init__(self, component: str, model_name: str, count_tokens: Callable[[str], int]) -> None:
+        super().__init__()
+        self.component = component
+        self.model_name = model_name
+        self.count_tokens = count_tokens
+        self._prompts: Dict[UUID, List[str]] = {}
+        self._usage_lock = threading.Lock()
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        with self._usage_lock:
+            self._prompts[run_id] = prompts
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._usage_lock:
+            self._prompts.pop(run_id, None)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._usage_lock:
+            prompts = self._prompts.pop(run_id, [])
+            before = (self.prompt_tokens, self.completion_tokens, self.total_cost)
+            super().on_llm_end(response, run_id=run_id, **kwargs)
+
+            if self.prompt_tokens == before[0] and self.completion_tokens == before[1]:
+                # No usage reported: count the tokens ourselves and price them like a reported usage
+                prompt_tokens = sum(self.count_tokens(prompt) for prompt in prompts)
+                completion_tokens = sum(self.count_tokens(generation.text) for generations in response.generations for generation in generations)
+                super().on_llm_end(LLMResult(generations=[], llm_output={
+                    "token_usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens
+                    },
+                    "model_name": self.model_name
+                }))
+
+            prompt_tokens = self.prompt_tokens - before[0]
+            completion_tokens = self.completion_tokens - before[1]
+            cost = self.total_cost - before[2]
+
+        for kind, tokens in (("prompt", prompt_tokens), ("completion", completion_tokens)):
+            LLM_TOKENS.labels(component=self.component, kind=kind).inc(tokens)
+            LLM_CALL_TOKENS.labels(component=self.component, kind=kind).observe(tokens)
+        LLM_COST.labels(component=self.component).inc(cost)
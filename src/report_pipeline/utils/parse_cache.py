@@ -0,0 +1,46 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from typing import List, Optional
+
+
+class ParseCache:
+    """Raw LLMSherpa layout JSON stored gzipped on disk, keyed by the PDF's content hash.
+
+    Unchanged PDFs are rebuilt into a Sherpa document locally instead of being sent to the
+    parsing service again, which also lets ingestion run offline from cached fixtures.
+    """
+
+    def __init__(self, cache_dir: str) -> None:
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def content_hash(pdf_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(pdf_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def contains(self, content_hash: str) -> bool:
+        return os.path.exists(self._path(content_hash))
+
+    def load(self, content_hash: str) -> Optional[List[dict]]:
+        path = self._path(content_hash)
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def store(self, content_hash: str, blocks_json: List[dict]) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(content_hash)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(blocks_json, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def _path(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{content_hash}.json.gz")
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, Optional, Tuple, TypeVar, Union
+
+import openai
+
+from report_pipeline.utils.metrics import API_RETRIES, CONCURRENCY_LIMIT, span
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Failures worth another attempt: rate limits, and the transient errors the OpenAI client would retry itself
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+_Waiter = Union[threading.Event, Tuple[asyncio.AbstractEventLoop, asyncio.Future]]
+
+
+class RateLimiter:
+    """Shared guard for one rate-limited API: a concurrency cap, a tokens-per-minute budget and retries.
+
+    The concurrency limit is adaptive: it halves on every rate limit error and grows back
+    by one slot after `recovery_successes` successful calls, so a burst queues up here
+    instead of failing upstream. Rate-limited calls, connection errors, timeouts and 5xx
+    responses are retried with full-jitter exponential backoff, honouring Retry-After; only
+    rate limits lower the concurrency. Callers can be threads (`call`) or coroutines
+    (`acall`, `astream`), slots are shared between both in FIFO order.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        tokens_per_minute: int = 0,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        recovery_successes: int = 20
+    ) -> None:
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.recovery_successes = recovery_successes
+
+        self.limit = self.max_concurrency
+        self._in_use = 0
+        self._successes = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self._tokens = float(tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+        CONCURRENCY_LIMIT.labels(client=name).set(self.limit)
+
+    def call(self, fn: Callable[[], T], tokens: int = 0) -> T:
+        for attempt in range(self.max_retries + 1):
+            with span("rate_limiter.wait", client=self.name):
+                time.sleep(self._reserve_tokens(tokens))
+                self._acquire()
+            try:
+                result = fn()
+            except RETRYABLE_ERRORS as e:
+                delay = self._on_error(attempt, e)
+            else:
+                self._on_success()
+                return result
+            finally:
+                self._release()
+            time.sleep(delay)
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+        for attempt in range(self.max_retries + 1):
+            with span("rate_limiter.wait", client=self.name):
+                await asyncio.sleep(self._reserve_tokens(tokens))
+                await self._aacquire()
+            try:
+                result = await fn()
+            except RETRYABLE_ERRORS as e:
+                delay = self._on_error(attempt, e)
+            else:
+                self._on_success()
+                return result
+            finally:
+                self._release()
+            await asyncio.sleep(delay)
+
+    async def astream(self, fn: Callable[[], AsyncIterator[T]], tokens: int = 0) -> AsyncIterator[T]:
+        """Hold a slot for the whole stream. Only a stream rejected before its first item is retried."""
+        for attempt in range(self.max_retries + 1):
+            with span("rate_limiter.wait", client=self.name):
+                await asyncio.sleep(self._reserve_tokens(tokens))
+                await self._aacquire()
+            started = False
+            try:
+                async for item in fn():
+                    started = True
+                    yield item
+            except RETRYABLE_ERRORS as e:
+                if started:
+                    raise
+                delay = self._on_error(attempt, e)
+            else:
+                self._on_success()
+                return
+            finally:
+                self._release()
+            await asyncio.sleep(delay)
+
+    def _reserve_tokens(self, tokens: int) -> float:
+        """Take `tokens` from the bucket, returning how long to wait until they are actually available."""
+        if not self.tokens_per_minute or not tokens:
+            return 0.0
+
+        rate = self.tokens_per_minute / 60
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.tokens_per_minute, self._tokens + (now - self._refilled_at) * rate)
+            self._refilled_at = now
+            # A call larger than the whole budget would otherwise never fit
+            self._tokens -= min(tokens, self.tokens_per_minute)
+            return max(0.0, -self._tokens / rate)
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._in_use < self.limit and not self._waiters:
+                self._in_use += 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def _aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._in_use < self.limit and not self._waiters:
+                self._in_use += 1
+                return
+            future = loop.create_future()
+            waiter = (loop, future)
+            self._waiters.append(waiter)
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            if not future.cancelled():
+                # The slot was granted just before the cancellation
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_use -= 1
+            self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self._in_use < self.limit:
+            waiter = self._waiters.popleft()
+            self._in_use += 1
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+            else:
+                loop, future = waiter
+                loop.call_soon_threadsafe(self._grant, future)
+
+    def _grant(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self._release()
+        else:
+            future.set_result(None)
+
+    def _on_success(self) -> None:
+        with self._lock:
+            self._successes += 1
+            if self.limit < self.max_concurrency and self._successes >= self.recovery_successes:
+                self.limit += 1
+                self._successes = 0
+                CONCURRENCY_LIMIT.labels(client=self.name).set(self.limit)
+                self._wake_waiters()
+
+    def _on_error(self, attempt: int, error: openai.APIError) -> float:
+        """Return the backoff before the next attempt, re-raising when out of retries. Rate limits also shrink the concurrency limit."""
+        if isinstance(error, openai.RateLimitError):
+            with self._lock:
+                self._successes = 0
+                self.limit = max(1, self.limit // 2)
+                CONCURRENCY_LIMIT.labels(client=self.name).set(self.limit)
+
+        if attempt >= self.max_retries or error.code == "insufficient_quota":
+            raise error
+
+        delay = max(
+            random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)),
+            _retry_after(error) or 0.0
+        )
+        API_RETRIES.labels(client=self.name, error=type(error).__name__).inc()
+        logger.warning(
+            "%s call failed with %s (attempt %d/%d), retrying in %.1fs with concurrency limit %d",
+            self.name, type(error).__name__, attempt + 1, self.max_retries + 1, delay, self.limit
+        )
+        return delay
+
+
+def _retry_after(error: openai.APIError) -> Optional[float]:
+    try:
+        return float(error.response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
@@ -1,16 +1,35 @@
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from langchain_core.documents import Document
 
 class SearchResults:
-    def __init__(self) -> None:
-        self.unique_docs: List[Document] = []
-        self.doc_ids: List[int] = []
-        
-    def add_result(self, document: Document):
-        if document.metadata["block_idx"] in self.doc_ids:
-            return
-        self.unique_docs.append(document)
-        self.doc_ids.append(document.metadata["block_idx"])
-        
+    """Fuses the ranked result lists of several queries and indexes with reciprocal rank fusion.
+
+    Documents are deduplicated on their (document_id, block_idx) key; each ranked list adds
+    1 / (rrf_k + rank) to a document's score and the best `max_results` are returned.
+    """
+    def __init__(self, max_results: Optional[int] = None, rrf_k: int = 60) -> None:
+        self.max_results = max_results
+        self.rrf_k = rrf_k
+        self.documents: Dict[Tuple[str, int], Document] = {}
+        self.scores: Dict[Tuple[str, int], float] = {}
+
+    @staticmethod
+    def document_key(document: Document) -> Tuple[str, int]:
+        return document.metadata.get("document_id", ""), document.metadata["block_idx"]
+
+    def add_ranked(self, documents: List[Document]) -> None:
+        """Add one ranked result list, best match first."""
+        for rank, document in enumerate(documents, start=1):
+            key = self.document_key(document)
+            self.documents.setdefault(key, document)
+            self.scores[key] = self.scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank)
+
+    def get_scored_results(self) -> List[Tuple[Document, float]]:
+        # sorted() is stable, so ties keep first-seen order
+        ranked_keys = sorted(self.scores, key=self.scores.get, reverse=True)
+        if self.max_results is not None:
+            ranked_keys = ranked_keys[:self.max_results]
+        return [(self.documents[key], self.scores[key]) for key in ranked_keys]
+
     def get_results(self) -> List[Document]:
-        return self.unique_docs
\ No newline at end of file
+        return [document for document, _ in self.get_scored_results()]
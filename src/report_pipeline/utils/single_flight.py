@@ -0,0 +1,31 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Coalesce concurrent calls with the same key into one execution whose result every caller gets.
+
+    The shared execution runs as its own task, so a caller that disconnects does not cancel
+    it for the others. The key is forgotten as soon as the execution finishes: later calls
+    start a fresh one.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def is_in_flight(self, key: Hashable) -> bool:
+        return key in self._in_flight
@@ -0,0 +1,70 @@
+import json
+import re
+from typing import Dict, List
+
+
+SLIDES_ARRAY_START = re.compile(r'"slides"\s*:\s*\[')
+
+
+class SlideStreamParser:
+    """Incrementally extract complete slides from a streamed `Presentation` JSON completion.
+
+    Text is fed chunk by chunk; every slide object is returned as a dict as soon as its
+    closing brace arrives, without waiting for the rest of the presentation.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.slides_emitted = 0
+
+        self._scan_pos = 0
+        self._in_slides = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start = 0
+
+    def feed(self, chunk: str) -> List[Dict]:
+        self.text += chunk
+        if self._finished:
+            return []
+
+        if not self._in_slides:
+            match = SLIDES_ARRAY_START.search(self.text)
+            if match is None:
+                return []
+            self._in_slides = True
+            self._scan_pos = match.end()
+
+        slides = []
+        while self._scan_pos < len(self.text):
+            char = self.text[self._scan_pos]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._object_start = self._scan_pos
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    raw_slide = self.text[self._object_start:self._scan_pos + 1]
+                    slides.append(json.loads(raw_slide))
+            elif char == "]" and self._depth == 0:
+                self._finished = True
+                self._scan_pos += 1
+                break
+
+            self._scan_pos += 1
+
+        self.slides_emitted += len(slides)
+        return slides
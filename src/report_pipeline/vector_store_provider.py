@@ -0,0 +1,132 @@
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+
+from langchain_core.embeddings import Embeddings
+
+from report_pipeline.pdf_processor import (
+    DEFAULT_COLLECTION_NAME,
+    DEFAULT_PERSIST_DIRECTORY,
+    VectorStoreManager,
+    get_embedding_function,
+)
+
+
+ACTIVE_COLLECTION_FILE = "ACTIVE_COLLECTION"
+
+T = TypeVar("T")
+
+
+class VectorStoreProvider:
+    """Application-lifetime owner of the active VectorStoreManager.
+
+    Requests lease the active store instead of opening their own. A rebuild fills a fresh
+    collection and swaps it in atomically; the replaced collection is only dropped once
+    the last request holding it has returned its lease.
+    """
+
+    def __init__(
+        self,
+        persist_directory: str = DEFAULT_PERSIST_DIRECTORY,
+        base_collection_name: str = DEFAULT_COLLECTION_NAME,
+        embedding_function: Optional[Embeddings] = None
+    ) -> None:
+        self.persist_directory = persist_directory
+        self.base_collection_name = base_collection_name
+        self._embedding_function = embedding_function
+
+        self._active: Optional[VectorStoreManager] = None
+        self._leases: Dict[int, int] = {}
+        self._retired: Dict[int, VectorStoreManager] = {}
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+
+    @property
+    def embedding_function(self) -> Embeddings:
+        return self._embedding_function or get_embedding_function()
+
+    def open(self) -> None:
+        store = VectorStoreManager(self._read_active_collection(), self.persist_directory, self.embedding_function)
+        with self._lock:
+            self._active = store
+
+    def close(self) -> None:
+        with self._lock:
+            self._active = None
+
+    @contextmanager
+    def lease(self) -> Iterator[VectorStoreManager]:
+        with self._lock:
+            if self._active is None:
+                raise RuntimeError("Vector store has not been opened")
+            store = self._active
+            self._leases[id(store)] = self._leases.get(id(store), 0) + 1
+
+        try:
+            yield store
+        finally:
+            self._release(store)
+
+    def update(self, apply: Callable[[VectorStoreManager], T]) -> T:
+        """Apply an in-place change to the active collection, serialised with other writers."""
+        with self._rebuild_lock, self.lease() as store:
+            return apply(store)
+
+    def rebuild(self, fill: Callable[[VectorStoreManager], None]) -> None:
+        """Fill a new collection with `fill` and make it the active one."""
+        with self._rebuild_lock:
+            collection_name = f"{self.base_collection_name}_{uuid.uuid4().hex[:8]}"
+            replacement = VectorStoreManager(collection_name, self.persist_directory, self.embedding_function)
+            try:
+                fill(replacement)
+            except Exception:
+                replacement.drop_collection()
+                raise
+
+            self._swap(replacement)
+
+    def _swap(self, replacement: VectorStoreManager) -> None:
+        self._write_active_collection(replacement.collection_name)
+
+        with self._lock:
+            previous = self._active
+            self._active = replacement
+            if previous is None:
+                return
+            if self._leases.get(id(previous), 0) > 0:
+                self._retired[id(previous)] = previous
+                return
+
+        previous.drop_collection()
+
+    def _release(self, store: VectorStoreManager) -> None:
+        with self._lock:
+            remaining = self._leases[id(store)] - 1
+            if remaining > 0:
+                self._leases[id(store)] = remaining
+                return
+            del self._leases[id(store)]
+            retired = self._retired.pop(id(store), None)
+
+        if retired is not None:
+            retired.drop_collection()
+
+    def _active_collection_path(self) -> str:
+        return os.path.join(self.persist_directory, ACTIVE_COLLECTION_FILE)
+
+    def _read_active_collection(self) -> str:
+        path = self._active_collection_path()
+        if not os.path.exists(path):
+            return self.base_collection_name
+        with open(path) as f:
+            return f.read().strip() or self.base_collection_name
+
+    def _write_active_collection(self, collection_name: str) -> None:
+        os.makedirs(self.persist_directory, exist_ok=True)
+        path = self._active_collection_path()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(collection_name)
+        os.replace(tmp_path, path)
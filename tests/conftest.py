@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The pipeline modules, and the offline fakes of the benchmark harness
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-tests")
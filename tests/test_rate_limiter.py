@@ -0,0 +1,229 @@
+import asyncio
+import threading
+
+import httpx
+import openai
+import pytest
+
+from report_pipeline.utils import rate_limiter as rate_limiter_module
+from report_pipeline.utils.rate_limiter import RateLimiter
+
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/completions")
+
+
+def rate_limit_error(retry_after=None, code=None):
+    headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+    body = {"code": code} if code else None
+    return openai.RateLimitError("rate limited", response=httpx.Response(429, headers=headers, request=REQUEST), body=body)
+
+
+def server_error():
+    return openai.InternalServerError("bad gateway", response=httpx.Response(502, request=REQUEST), body=None)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff delays instead of sleeping them."""
+    delays = []
+
+    async def fake_async_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(rate_limiter_module.time, "sleep", delays.append)
+    monkeypatch.setattr(rate_limiter_module.asyncio, "sleep", fake_async_sleep)
+    return delays
+
+
+def failing(*errors, result="ok"):
+    """A call raising `errors` in turn, then returning `result`."""
+    remaining = list(errors)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if remaining:
+            raise remaining.pop(0)
+        return result
+
+    return fn, calls
+
+
+def test_rate_limited_call_backs_off_and_halves_concurrency(sleeps):
+    limiter = RateLimiter("test", max_concurrency=4, max_retries=3, base_delay=1.0, max_delay=8.0)
+    fn, calls = failing(rate_limit_error(), rate_limit_error(retry_after=5))
+
+    assert limiter.call(fn) == "ok"
+    assert len(calls) == 3
+    assert limiter.limit == 1
+    # Every attempt first waits for its (empty) token budget, then each failure backs off
+    backoffs = sleeps[1::2]
+    assert len(backoffs) == 2
+    assert 0 <= backoffs[0] <= 1.0
+    # Retry-After wins over a shorter jittered delay
+    assert backoffs[1] >= 5
+
+
+def test_transient_errors_are_retried_without_lowering_concurrency(sleeps):
+    limiter = RateLimiter("test", max_concurrency=4, max_retries=3, base_delay=0.5)
+    fn, calls = failing(openai.APIConnectionError(request=REQUEST), openai.APITimeoutError(request=REQUEST), server_error())
+
+    assert limiter.call(fn) == "ok"
+    assert len(calls) == 4
+    assert limiter.limit == 4
+
+
+def test_retries_are_bounded_and_quota_errors_are_not_retried(sleeps):
+    limiter = RateLimiter("test", max_concurrency=2, max_retries=2, base_delay=0.01)
+    fn, calls = failing(*(rate_limit_error() for _ in range(5)))
+    with pytest.raises(openai.RateLimitError):
+        limiter.call(fn)
+    assert len(calls) == 3
+
+    fn, calls = failing(rate_limit_error(code="insufficient_quota"))
+    with pytest.raises(openai.RateLimitError):
+        limiter.call(fn)
+    assert len(calls) == 1
+    assert limiter._in_use == 0
+
+
+def test_concurrency_recovers_after_successes(sleeps):
+    limiter = RateLimiter("test", max_concurrency=4, max_retries=1, recovery_successes=2)
+    limiter.call(failing(rate_limit_error())[0])
+    assert limiter.limit == 2
+
+    for _ in range(4):
+        limiter.call(lambda: None)
+    assert limiter.limit == 4
+
+
+def test_async_calls_respect_the_cap_and_retry():
+    limiter = RateLimiter("test", max_concurrency=3, max_retries=2, base_delay=0.001)
+    active = peak = 0
+    first_call = True
+
+    async def work():
+        nonlocal active, peak, first_call
+        active += 1
+        peak = max(peak, active)
+        try:
+            await asyncio.sleep(0.01)
+            if first_call:
+                first_call = False
+                raise rate_limit_error()
+            return 1
+        finally:
+            active -= 1
+
+    async def run():
+        return await asyncio.gather(*(limiter.acall(work) for _ in range(12)))
+
+    assert sum(asyncio.run(run())) == 12
+    assert peak <= 3
+    assert limiter._in_use == 0
+
+
+def test_stream_is_only_retried_before_its_first_item():
+    limiter = RateLimiter("test", max_concurrency=1, max_retries=2, base_delay=0.001)
+    attempts = []
+
+    def stream(fail_after):
+        async def items():
+            attempts.append(1)
+            for i in range(3):
+                if len(attempts) == 1 and i == fail_after:
+                    raise rate_limit_error()
+                yield i
+        return items
+
+    async def collect(fn):
+        return [item async for item in limiter.astream(fn)]
+
+    assert asyncio.run(collect(stream(fail_after=0))) == [0, 1, 2]
+    assert len(attempts) == 2
+
+    attempts.clear()
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(collect(stream(fail_after=1)))
+    assert len(attempts) == 1
+    assert limiter._in_use == 0
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    limiter = RateLimiter("test", max_concurrency=1)
+
+    async def run():
+        await limiter._aacquire()
+        waiter = asyncio.create_task(limiter._aacquire())
+        await asyncio.sleep(0)
+        assert len(limiter._waiters) == 1
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert not limiter._waiters
+
+        limiter._release()
+        await asyncio.wait_for(limiter._aacquire(), timeout=1)
+        limiter._release()
+
+    asyncio.run(run())
+    assert limiter._in_use == 0
+
+
+@pytest.mark.parametrize("run_grant_first", [False, True])
+def test_slot_granted_to_a_cancelled_waiter_is_handed_back(run_grant_first):
+    limiter = RateLimiter("test", max_concurrency=1)
+
+    async def run():
+        await limiter._aacquire()
+        waiter = asyncio.create_task(limiter._aacquire())
+        await asyncio.sleep(0)
+
+        # The slot is handed to the waiter, which is cancelled before it gets to run
+        limiter._release()
+        if run_grant_first:
+            await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await asyncio.sleep(0)
+
+        assert limiter._in_use == 0
+        await asyncio.wait_for(limiter._aacquire(), timeout=1)
+        limiter._release()
+
+    asyncio.run(run())
+
+
+def test_threads_and_coroutines_share_slots_in_order():
+    limiter = RateLimiter("test", max_concurrency=1)
+    order = []
+
+    async def run():
+        await limiter._aacquire()
+        thread = threading.Thread(target=lambda: limiter.call(lambda: order.append("thread")))
+        thread.start()
+        while not limiter._waiters:
+            await asyncio.sleep(0.001)
+        coroutine = asyncio.create_task(limiter.acall(lambda: asyncio.sleep(0, "coroutine")))
+        await asyncio.sleep(0.01)
+        assert order == []
+
+        limiter._release()
+        order.append(await asyncio.wait_for(coroutine, timeout=1))
+        await asyncio.to_thread(thread.join, 1)
+
+    asyncio.run(run())
+    assert order == ["thread", "coroutine"]
+    assert limiter._in_use == 0
+
+
+def test_token_budget_delays_calls_beyond_the_rate():
+    limiter = RateLimiter("test", max_concurrency=8, tokens_per_minute=600)
+
+    assert limiter._reserve_tokens(300) == 0
+    assert limiter._reserve_tokens(300) == 0
+    # 10 tokens per second: the next 300 are available in about 30 seconds
+    assert limiter._reserve_tokens(300) == pytest.approx(30, abs=0.5)
+    # Larger than the whole budget still gets through eventually
+    assert limiter._reserve_tokens(10_000) == pytest.approx(90, abs=0.5)
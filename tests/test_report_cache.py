@@ -0,0 +1,68 @@
+from langchain_core.documents import Document
+
+from report_pipeline.report_cache import ReportCache
+from report_pipeline.report_generator import Presentation, ReportType, SlideContent
+
+
+def blocks(*block_indices):
+    return [Document(page_content="", metadata={"document_id": "report", "block_idx": i}) for i in block_indices]
+
+
+def presentation(title="Summary"):
+    return Presentation(slides=[SlideContent(title=title, content=["Revenue grew 8%"], slide_type="summary")])
+
+
+def test_key_depends_on_type_prompt_and_blocks_but_not_their_order():
+    cache = ReportCache()
+    key = cache.make_key(ReportType.CFO, "v1", blocks(1, 2))
+
+    assert cache.make_key(ReportType.CFO, "v1", blocks(2, 1)) == key
+    assert cache.make_key(ReportType.CEO, "v1", blocks(1, 2)) != key
+    assert cache.make_key(ReportType.CFO, "v2", blocks(1, 2)) != key
+    assert cache.make_key(ReportType.CFO, "v1", blocks(1, 3)) != key
+
+
+def test_returned_reports_are_copies():
+    cache = ReportCache()
+    key = cache.make_key(ReportType.CFO, "v1", blocks(1))
+    cache.put(key, presentation())
+
+    cache.get(key).slides[0].title = "Changed"
+    assert cache.get(key).slides[0].title == "Summary"
+
+
+def test_bumping_the_corpus_version_invalidates_every_entry(tmp_path):
+    cache = ReportCache(cache_dir=str(tmp_path))
+    key = cache.make_key(ReportType.CFO, "v1", blocks(1))
+    cache.put(key, presentation())
+
+    cache.bump_corpus_version()
+    assert cache.get(key) is None
+    assert cache.make_key(ReportType.CFO, "v1", blocks(1)) != key
+    assert not list(tmp_path.glob("*.json"))
+
+
+def test_persisted_entries_and_version_survive_a_restart(tmp_path):
+    cache = ReportCache(cache_dir=str(tmp_path))
+    cache.bump_corpus_version()
+    key = cache.make_key(ReportType.COO, "v1", blocks(1))
+    cache.put(key, presentation("Operations"))
+
+    restarted = ReportCache(cache_dir=str(tmp_path))
+    assert restarted.corpus_version == cache.corpus_version
+    assert restarted.make_key(ReportType.COO, "v1", blocks(1)) == key
+    assert restarted.get(key).slides[0].title == "Operations"
+
+
+def test_expired_and_evicted_entries_are_misses(tmp_path):
+    expired = ReportCache(ttl_seconds=-1)
+    key = expired.make_key(ReportType.CFO, "v1", blocks(1))
+    expired.put(key, presentation())
+    assert expired.get(key) is None
+
+    cache = ReportCache(max_entries=1, cache_dir=str(tmp_path))
+    first, second = (cache.make_key(ReportType.CFO, "v1", blocks(i)) for i in (1, 2))
+    cache.put(first, presentation())
+    cache.put(second, presentation())
+    assert cache.get(first) is None
+    assert cache.get(second) is not None
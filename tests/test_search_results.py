@@ -0,0 +1,49 @@
+import pytest
+
+from langchain_core.documents import Document
+
+from report_pipeline.utils.search_results import SearchResults
+
+
+def block(block_idx, document_id="report"):
+    return Document(page_content=f"block {block_idx}", metadata={"document_id": document_id, "block_idx": block_idx})
+
+
+def indices(documents):
+    return [(document.metadata["document_id"], document.metadata["block_idx"]) for document in documents]
+
+
+def test_blocks_found_by_several_lists_rank_first():
+    results = SearchResults()
+    results.add_ranked([block(1), block(2), block(3)])
+    results.add_ranked([block(3), block(4)])
+    results.add_ranked([block(5), block(3)])
+
+    ranked = results.get_scored_results()
+    assert indices(doc for doc, _ in ranked)[0] == ("report", 3)
+    assert ranked[0][1] == pytest.approx(1 / 61 + 1 / 62 + 1 / 63)
+    assert [score for _, score in ranked] == sorted((score for _, score in ranked), reverse=True)
+
+
+def test_duplicates_are_merged_per_document():
+    results = SearchResults()
+    results.add_ranked([block(1), block(1, "other")])
+    results.add_ranked([block(1)])
+
+    assert indices(results.get_results()) == [("report", 1), ("other", 1)]
+
+
+def test_ties_keep_first_seen_order_and_the_cap_applies():
+    results = SearchResults(max_results=2)
+    results.add_ranked([block(7)])
+    results.add_ranked([block(8)])
+    results.add_ranked([block(9)])
+
+    assert indices(results.get_results()) == [("report", 7), ("report", 8)]
+
+
+def test_no_cap_returns_every_block():
+    results = SearchResults()
+    results.add_ranked([block(i) for i in range(30)])
+
+    assert len(results.get_results()) == 30
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from report_pipeline.utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return object()
+
+    async def run():
+        return await asyncio.gather(*(flight.run("key", work) for _ in range(5)), flight.run("other", work))
+
+    results = asyncio.run(run())
+    assert len(runs) == 2
+    assert len({id(result) for result in results[:5]}) == 1
+    assert results[5] is not results[0]
+    assert len(flight) == 0
+
+
+def test_failure_is_shared_and_not_remembered():
+    flight = SingleFlight()
+    runs = []
+
+    async def failing():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("generation failed")
+
+    async def run():
+        results = await asyncio.gather(*(flight.run("key", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert len(runs) == 1
+
+        # The next call starts over instead of replaying the failure
+        with pytest.raises(ValueError):
+            await flight.run("key", failing)
+        assert len(runs) == 2
+
+    asyncio.run(run())
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "report"
+
+    async def run():
+        first = asyncio.create_task(flight.run("key", work))
+        second = asyncio.create_task(flight.run("key", work))
+        await asyncio.sleep(0.005)
+
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert await second == "report"
+        assert not flight.is_in_flight("key")
+
+    asyncio.run(run())
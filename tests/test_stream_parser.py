@@ -0,0 +1,45 @@
+import json
+
+from report_pipeline.utils.stream_parser import SlideStreamParser
+
+
+SLIDES = [
+    {"title": "Summary {draft}", "content": ["Revenue \"grew\" 8%", "Margin } held"], "slide_type": "summary"},
+    {"title": "Next steps", "content": [], "recommendations": ["Cut [costs]"], "slide_type": "action_items"},
+]
+COMPLETION = "Here is the report:\n```json\n" + json.dumps({"slides": SLIDES}, indent=2) + "\n```"
+
+
+def test_slides_are_emitted_as_soon_as_they_close():
+    parser = SlideStreamParser()
+    first_slide_end = COMPLETION.index('"slide_type": "summary"') + len('"slide_type": "summary"\n    }')
+
+    assert parser.feed(COMPLETION[:first_slide_end - 1]) == []
+    assert parser.feed(COMPLETION[first_slide_end - 1:first_slide_end]) == [SLIDES[0]]
+    assert parser.feed(COMPLETION[first_slide_end:]) == [SLIDES[1]]
+    assert parser.slides_emitted == 2
+
+
+def test_any_chunking_yields_the_same_slides():
+    for chunk_size in (1, 3, 17, len(COMPLETION)):
+        parser = SlideStreamParser()
+        slides = []
+        for start in range(0, len(COMPLETION), chunk_size):
+            slides.extend(parser.feed(COMPLETION[start:start + chunk_size]))
+        assert slides == SLIDES
+        assert parser.text == COMPLETION
+
+
+def test_text_after_the_slides_array_is_ignored():
+    parser = SlideStreamParser()
+    slides = parser.feed('{"slides": [{"title": "A", "slide_type": "content"}], "notes": {"x": 1}}')
+    slides += parser.feed(' {"title": "B"}')
+
+    assert slides == [{"title": "A", "slide_type": "content"}]
+
+
+def test_nothing_is_emitted_before_the_slides_key():
+    parser = SlideStreamParser()
+
+    assert parser.feed('{"meta": {"title": "not a slide"}, ') == []
+    assert parser.feed('"slides": [{"title": "A", "slide_type": "summary"}]}') == [{"title": "A", "slide_type": "summary"}]
@@ -0,0 +1,125 @@
+import pytest
+from langchain_chroma import Chroma
+from llmsherpa.readers import Document as SherpaDocument
+
+from fakes import FakeEmbeddings, synthetic_layout
+from report_pipeline.pdf_processor import DEFAULT_DOCUMENT_ID, PDFProcessor, RetrievalMode, VectorStoreManager
+
+
+QUERIES = ["revenue growth and margin", "debt ratio and cash flow"]
+
+
+@pytest.fixture
+def embeddings():
+    return FakeEmbeddings(dimension=32)
+
+
+@pytest.fixture
+def store(tmp_path, embeddings):
+    return VectorStoreManager("content", str(tmp_path), embeddings, index_sections=False)
+
+
+def layout(sections=4, seed=0):
+    return synthetic_layout(sections, seed=seed)
+
+
+def blocks(layout_json, document_id, year=None):
+    processor = PDFProcessor(pdf_reader=object())
+    return processor.iter_document_blocks(SherpaDocument(layout_json), document_id, year)
+
+
+def test_reindexing_an_unchanged_document_embeds_nothing(store, embeddings):
+    stats = store.store_content("acme-2022", blocks(layout(), "acme-2022"))
+    embedded = embeddings.texts_embedded
+
+    assert stats["added"] > 0 and stats["deleted"] == 0
+    assert store.store_content("acme-2022", blocks(layout(), "acme-2022")) == {"added": 0, "deleted": 0, "unchanged": stats["added"]}
+    assert embeddings.texts_embedded == embedded
+
+
+def test_only_changed_blocks_are_replaced(store, embeddings):
+    original = layout()
+    stats = store.store_content("acme-2022", blocks(original, "acme-2022"))
+
+    changed = [dict(block) for block in original]
+    paragraph = next(block for block in changed if block["tag"] == "para")
+    paragraph["sentences"] = ["Revenue was restated to 1,100.0 EUR."]
+    embedded = embeddings.texts_embedded
+
+    assert store.store_content("acme-2022", blocks(changed, "acme-2022")) == {"added": 1, "deleted": 1, "unchanged": stats["added"] - 1}
+    assert embeddings.texts_embedded == embedded + 1
+    assert store.vector_store._collection.count() == stats["added"]
+    assert len(store.lexical_index) == stats["added"]
+
+
+def test_other_documents_are_left_alone(store):
+    first = store.store_content("acme-2022", blocks(layout(), "acme-2022"))
+    store.store_content("acme-2023", blocks(layout(seed=1), "acme-2023"))
+    store.store_content("acme-2023", blocks(layout(sections=2, seed=1), "acme-2023"))
+
+    assert store.list_documents() == ["acme-2022", "acme-2023"]
+    assert store.store_content("acme-2022", blocks(layout(), "acme-2022"))["unchanged"] == first["added"]
+
+
+@pytest.mark.parametrize("mode", list(RetrievalMode))
+def test_retrieval_respects_document_and_year_filters(store, mode):
+    store.store_content("acme-2022", blocks(layout(), "acme-2022"))
+    store.store_content("acme-2023", blocks(layout(seed=1), "acme-2023"))
+    store.store_content("beta", blocks(layout(seed=2), "beta", year=2023))
+
+    def retrieved(document_id=None, year=None):
+        filter = VectorStoreManager.document_filter(document_id, year)
+        docs = store.retrieve_content_batch(QUERIES, filter=filter, mode=mode)
+        return {(doc.metadata["document_id"], doc.metadata.get("year")) for doc in docs}
+
+    assert retrieved("acme-2022") == {("acme-2022", 2022)}
+    assert retrieved(year=2023) == {("acme-2023", 2023), ("beta", 2023)}
+    assert retrieved("beta", 2023) == {("beta", 2023)}
+    assert retrieved("beta", 2022) == set()
+    assert retrieved(year=1999) == set()
+
+
+def test_retrieval_is_capped_at_max_blocks(store):
+    store.store_content("acme-2022", blocks(layout(), "acme-2022"))
+
+    docs = store.retrieve_content_batch(QUERIES, k=8, max_blocks=5)
+    assert len(docs) == 5
+    assert len({(doc.metadata["document_id"], doc.metadata["block_idx"]) for doc in docs}) == 5
+
+
+def test_registry_keeps_the_year_across_reopening(tmp_path, embeddings, store):
+    store.store_content("beta", blocks(layout(), "beta", year=2021))
+
+    reopened = VectorStoreManager("content", str(tmp_path), embeddings, index_sections=False)
+    assert reopened.list_documents() == ["beta"]
+    assert reopened.document_year("beta") == 2021
+    assert reopened.document_year("unknown") is None
+
+
+def test_entries_without_a_document_id_are_adopted_and_replaced(tmp_path, embeddings):
+    document_blocks = list(blocks(layout(), DEFAULT_DOCUMENT_ID))
+    legacy = Chroma(collection_name="content", embedding_function=embeddings, persist_directory=str(tmp_path))
+    legacy.add_texts(
+        [block.processed_text for block in document_blocks],
+        [{key: value for key, value in block.get_metadata().items() if key not in ("document_id", "year")} for block in document_blocks]
+    )
+
+    store = VectorStoreManager("content", str(tmp_path), embeddings, index_sections=False)
+    assert store.list_documents() == [DEFAULT_DOCUMENT_ID]
+    assert len(store.lexical_index) == len(document_blocks)
+
+    stats = store.store_content(DEFAULT_DOCUMENT_ID, iter(document_blocks))
+    assert stats == {"added": len(document_blocks), "deleted": len(document_blocks), "unchanged": 0}
+    assert store.vector_store._collection.count() == len(document_blocks)
+
+
+def test_section_summaries_are_only_indexed_when_enabled(tmp_path, embeddings):
+    with_sections = VectorStoreManager("content", str(tmp_path), embeddings, index_sections=True)
+    with_sections.store_content("acme-2022", blocks(layout(), "acme-2022"))
+    assert with_sections.section_store._collection.count() > 0
+
+    without_sections = VectorStoreManager("content", str(tmp_path), embeddings, index_sections=False)
+    embedded = embeddings.texts_embedded
+    without_sections.store_content("acme-2022", blocks(layout(), "acme-2022"))
+    assert embeddings.texts_embedded == embedded
+    assert without_sections.section_store._collection.count() == 0